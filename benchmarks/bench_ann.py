@@ -0,0 +1,69 @@
+"""Benchmark: recall@k vs latency of IVF approximate search against exact search.
+
+For each collection size the store is searched exactly once per query to
+get the ground truth, then with every --nprobe setting. Recall@k is the
+fraction of the exact top k that the approximate search also returned.
+The first approximate query only starts training the index in the
+background; the script checks that it returned without waiting for
+k-means.
+
+    python benchmarks/bench_ann.py --sizes 20000 100000 --nprobe 1 2 4 8 16 32
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_vectorstore import LookupEmbeddings, build_numpy_store, synthetic_vectors
+
+
+def run(store, n_queries, k, nprobe):
+    results, timings = [], []
+    for i in range(n_queries):
+        start = time.perf_counter()
+        docs = store.similarity_search(f"query {i}", k=k, nprobe=nprobe)
+        timings.append(time.perf_counter() - start)
+        results.append({d.page_content for d in docs})
+    return results, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20_000, 100_000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--nlist", type=int, default=None, help="IVF lists (default: sqrt(n))")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'chunks':>9}{'mode':>14}{f'recall@{args.k}':>12}{'p50 ms':>10}{'speedup':>9}")
+    for n in args.sizes:
+        chunks, queries = synthetic_vectors(n, args.queries)
+        texts = [f"chunk {i}" for i in range(n)]
+        store = build_numpy_store(texts, chunks, LookupEmbeddings(chunks, queries))
+        store.nlist = args.nlist
+
+        exact, exact_ms = run(store, args.queries, args.k, None)
+        print(f"{n:>9}{'exact':>14}{1.0:>12.3f}{exact_ms * 1000:>10.2f}{1.0:>8.1f}x")
+
+        start = time.perf_counter()
+        first = store.similarity_search("query 0", k=args.k, nprobe=args.nprobe[0])
+        first_ms = time.perf_counter() - start
+        store.train_ivf(wait=True)
+        train_ms = time.perf_counter() - start
+        print(f"{'':>9}{'first query':>14}{'':>12}{first_ms * 1000:>10.2f}   (searched exactly while training)")
+        print(f"{'':>9}{'train':>14}{'':>12}{train_ms * 1000:>10.0f}   (nlist={store._ivf.nlist})")
+        assert {d.page_content for d in first} == exact[0], "the query served while training was not exact"
+        assert first_ms < train_ms / 2, f"the first approximate query waited for training ({first_ms * 1000:.0f} ms)"
+        for nprobe in args.nprobe:
+            approx, approx_ms = run(store, args.queries, args.k, nprobe)
+            recall = statistics.mean(len(a & e) / len(e) for a, e in zip(approx, exact))
+            print(f"{'':>9}{f'nprobe={nprobe}':>14}{recall:>12.3f}{approx_ms * 1000:>10.2f}{exact_ms / approx_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
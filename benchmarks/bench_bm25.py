@@ -0,0 +1,72 @@
+"""Benchmark: BM25 keyword lookup latency and exact-identifier hit rate.
+
+Builds the keyword index of a NumpyVectorStore over synthetic chunks that
+each mention a unique invoice number and error code, then times lookups
+for those identifiers (the queries dense bge-small retrieval struggles
+with) and for plain-language questions with common terms.
+
+    python benchmarks/bench_bm25.py --sizes 10000 100000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hybrid import BM25Index
+
+WORDS = ("policy approval finance team payment employees receipts years expenses purchase "
+         "contract vendor shipment delivery refund warranty customer account balance report "
+         "quarter budget audit compliance travel invoice reimbursement manager deadline").split()
+
+
+def chunk_text(i, rng):
+    filler = " ".join(rng.choice(WORDS) for _ in range(120))
+    return f"Invoice INV-{i:07d} raised error code E{i:06d}. {filler}"
+
+
+def time_lookups(index, queries, k):
+    timings, hits = [], 0
+    for expected, query in queries:
+        start = time.perf_counter()
+        results = index.search(query, k)
+        timings.append(time.perf_counter() - start)
+        hits += expected is not None and any(doc_id == expected for doc_id, _ in results)
+    return statistics.median(timings) * 1000, sorted(timings)[int(0.95 * (len(timings) - 1))] * 1000, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'chunks':>9}{'build s':>9}{'query type':>16}{'p50 ms':>9}{'p95 ms':>9}{'hit rate':>10}")
+    for n in args.sizes:
+        rng = random.Random(0)
+        index = BM25Index()
+        start = time.perf_counter()
+        for batch in range(0, n, 1000):
+            ids = [str(i) for i in range(batch, min(n, batch + 1000))]
+            index.add(ids, [chunk_text(int(i), rng) for i in ids])
+        build_s = time.perf_counter() - start
+
+        targets = [rng.randrange(n) for _ in range(args.queries)]
+        id_queries = [(str(i), f"What went wrong with invoice INV-{i:07d}?") for i in targets]
+        code_queries = [(str(i), f"error E{i:06d}") for i in targets]
+        word_queries = [(None, " ".join(rng.sample(WORDS, 3))) for _ in range(args.queries)]
+        # Warm up: first lookup of a term compacts its postings
+        index.search(" ".join(WORDS), args.k)
+
+        for label, queries in (("identifier", id_queries), ("error code", code_queries), ("common words", word_queries)):
+            p50, p95, hits = time_lookups(index, queries, args.k)
+            rate = f"{hits / len(queries):.2f}" if queries[0][0] is not None else "-"
+            print(f"{n:>9}{build_s:>9.1f}{label:>16}{p50:>9.3f}{p95:>9.3f}{rate:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Benchmark: same-site crawl of a local fixture site.
+
+Serves a generated site (a tree of linked pages with a robots.txt that
+disallows one section, and the home page also served as /page/0 for the
+content-hash dedupe to catch) with a configurable per-request latency, crawls it
+with crawler.Crawler and reports pages indexed, time to the first indexed
+page vs the whole crawl, and the politeness actually observed by the
+server: the most requests a host saw at once and the smallest gap between
+request starts. It asserts that robots.txt, the depth and page caps, the
+content-hash dedupe, ``per_host`` and the delay all held, then repeats the
+crawl without a delay to check ``per_host`` on its own.
+
+    python benchmarks/bench_crawl.py
+    python benchmarks/bench_crawl.py --pages 200 --latency 0.05 --per-host 4 --delay 0
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler import Crawler
+from webfetch import Fetcher
+
+
+def make_handler(pages, fanout, latency, stats):
+    class SiteHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with stats["lock"]:
+                stats["paths"].append(self.path)
+            if self.path == "/robots.txt":
+                self.reply(b"User-agent: *\nDisallow: /private/\n", "text/plain")
+                return
+            path = self.path.rstrip("/") or "/"
+            number = 0 if path == "/" else int(path.rsplit("/", 1)[-1]) if path.startswith("/page/") else -1
+            if not 0 <= number < pages:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            with stats["lock"]:
+                stats["starts"].append(time.monotonic())
+                stats["active"] += 1
+                stats["max_active"] = max(stats["max_active"], stats["active"])
+            time.sleep(latency)
+            children = [number * fanout + i for i in range(1, fanout + 1) if number * fanout + i < pages]
+            links = "".join(f'<li><a href="/page/{child}">Page {child}</a></li>' for child in children)
+            body = (
+                f"<html><head><title>Page {number}</title></head><body>"
+                f"<nav><a href='/'>Home</a><a href='/private/admin'>Admin</a><a href='/page/{number}#top'>Top</a></nav>"
+                f"<main><h1>Page {number}</h1><p>Section {number} of the handbook covers invoice {number:05d}, "
+                f"its refund window and the escalation path for disputes.</p><ul>{links}</ul></main>"
+                "</body></html>"
+            ).encode()
+            with stats["lock"]:
+                stats["active"] -= 1
+            self.reply(body, "text/html; charset=utf-8")
+
+        def reply(self, body, content_type):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return SiteHandler
+
+
+def page_depth(number, fanout):
+    """Links from the home page to page ``number`` of the generated tree"""
+    depth = 0
+    while number:
+        number, depth = (number - 1) // fanout, depth + 1
+    return depth
+
+
+def crawl_site(args, per_host, delay):
+    """Crawl a fresh fixture site; returns ``(crawler, indexed {url: depth}, stats, seconds)``"""
+    stats = {"lock": threading.Lock(), "starts": [], "paths": [], "active": 0, "max_active": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.pages, args.fanout, args.latency, stats))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    indexed = {}
+    start = time.perf_counter()
+
+    def on_page(url, text, depth):
+        indexed[url] = depth
+        stats.setdefault("first", time.perf_counter() - start)
+        return len(text)
+
+    crawler = Crawler(
+        Fetcher(), [f"http://127.0.0.1:{server.server_port}/"], on_page,
+        max_depth=args.max_depth, max_pages=args.max_pages, per_host=per_host, delay=delay
+    ).start()
+    crawler.join()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    return crawler, indexed, stats, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=60, help="pages on the fixture site")
+    parser.add_argument("--fanout", type=int, default=4, help="links from each page to new pages")
+    parser.add_argument("--latency", type=float, default=0.05, help="server time per page (s)")
+    parser.add_argument("--max-depth", type=int, default=3)
+    parser.add_argument("--max-pages", type=int, default=50)
+    parser.add_argument("--per-host", type=int, default=2)
+    parser.add_argument("--delay", type=float, default=0.1)
+    args = parser.parse_args()
+
+    crawler, indexed, stats, total = crawl_site(args, args.per_host, args.delay)
+    starts = stats["starts"]
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    pages_indexed, fetched, _ = crawler.progress()
+    print(f"pages indexed        {pages_indexed}  (fetched {fetched}, robots-disallowed {crawler.pages_skipped})")
+    print(f"first page indexed   {stats.get('first', float('nan')) * 1000:.0f} ms")
+    print(f"whole crawl          {total * 1000:.0f} ms  ({fetched / total:.1f} pages/s)")
+    print(f"max concurrent/host  {stats['max_active']}  (limit {args.per_host})")
+    print(f"min start gap        {min(gaps) * 1000 if gaps else float('nan'):.0f} ms  (delay {args.delay * 1000:.0f} ms)")
+
+    check_crawl(args, crawler, indexed, stats, args.per_host)
+    assert not gaps or min(gaps) >= args.delay * 0.9, f"requests {min(gaps) * 1000:.0f} ms apart, delay is {args.delay * 1000:.0f} ms"
+
+    # Without a delay the per-host slots are the only limit left
+    crawler, indexed, stats, _ = crawl_site(args, args.per_host, 0.0)
+    check_crawl(args, crawler, indexed, stats, args.per_host)
+    print(f"no delay             max {stats['max_active']} concurrent/host (limit {args.per_host})")
+    print("ok")
+
+
+def check_crawl(args, crawler, indexed, stats, per_host):
+    """The crawl stayed within robots.txt, the depth and page caps and the host limit, and deduplicated"""
+    assert crawler.error is None, f"crawl failed: {crawler.error!r}"
+    assert not any(path.startswith("/private/") for path in stats["paths"]), "fetched a robots.txt-disallowed page"
+    assert crawler.pages_skipped >= 1, "the disallowed link was never considered"
+    assert len(stats["starts"]) <= args.max_pages, f"{len(stats['starts'])} pages fetched, cap is {args.max_pages}"
+    numbers = [0 if urlsplit(url).path == "/" else int(urlsplit(url).path.rsplit("/", 1)[-1]) for url in indexed]
+    assert all(depth <= args.max_depth for depth in indexed.values()), "followed links past max_depth"
+    assert all(page_depth(n, args.fanout) <= args.max_depth for n in numbers), "indexed a page deeper than max_depth"
+    assert len(numbers) == len(set(numbers)), "the same page content was indexed twice (/ and /page/0)"
+    assert stats["max_active"] <= per_host, f"{stats['max_active']} requests at once, per_host is {per_host}"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark: what dedupe.ChunkFilter removes before embedding, and what it must keep.
+
+Runs the filter the way the Documents page does (clean pages, split,
+drop near-duplicate chunks) over a generated report whose pages carry a
+running header, a "Page N of M" footer and a repeated boilerplate
+paragraph mid-page, and reports the lines and chunks skipped. It then checks the
+cases that must survive untouched:
+
+- invoice pages whose first and last lines are identifiers and amounts
+- short pages of numbered items (every line is near an edge)
+- template chunks that differ only in an identifier or amount
+- the bench_pages FILLER fixture: every INV- number stays in the index
+
+    python benchmarks/bench_dedupe.py --pages 200
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from dedupe import ChunkFilter
+from hybrid import tokenize
+from bench_pages import FILLER
+
+BOILERPLATE = (
+    "This document is provided for information only and does not constitute an offer. "
+    "All figures are unaudited and subject to change without notice. " * 4
+)
+
+
+def run(pages, chunk_size=1000):
+    """``(kept chunks, filter)`` of ``pages`` of one source, as the ingest pipeline produces them"""
+    chunk_filter = ChunkFilter()
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=0)
+    docs = [Document(page_content=text, metadata={"source": "doc.pdf", "page": i}) for i, text in enumerate(pages)]
+    cleaned = chunk_filter.clean_pages("doc.pdf", docs)
+    return chunk_filter.filter_chunks("doc.pdf", splitter.split_documents(cleaned)), chunk_filter
+
+
+def indexed_terms(chunks):
+    return {term for chunk in chunks for term in tokenize(chunk.page_content)}
+
+
+def check_keeps(name, pages, chunk_size=1000):
+    """Every identifier (term with a digit) of ``pages`` must still be in the kept chunks"""
+    chunks, chunk_filter = run(pages, chunk_size)
+    expected = {term for page in pages for term in tokenize(page) if any(c.isdigit() for c in term)}
+    missing = expected - indexed_terms(chunks)
+    assert not missing, f"{name}: identifiers dropped: {sorted(missing)[:10]}"
+    print(f"ok  {name:<44}{len(expected):>5} identifiers kept  "
+          f"({chunk_filter.lines_stripped} lines, {chunk_filter.chunks_dropped} chunks skipped)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    args = parser.parse_args()
+
+    report = [
+        "ACME Corp Annual Report 2024\nConfidential\n\n"
+        + FILLER.format(n=2 * i).replace(". ", ".\n")
+        + f"\n\n{BOILERPLATE}\n\n"
+        + FILLER.format(n=2 * i + 1).replace(". ", ".\n")
+        + f"\n\nPage {i + 1} of {args.pages}"
+        for i in range(args.pages)
+    ]
+    start = time.perf_counter()
+    chunks, chunk_filter = run(report, chunk_size=600)
+    elapsed = time.perf_counter() - start
+    stats = chunk_filter.report(0, 1)
+    print(f"report of {args.pages} pages: {stats['lines_stripped']} furniture lines stripped, "
+          f"{stats['chunks_dropped']}/{stats['chunks_seen']} chunks skipped, "
+          f"{stats['chars_saved'] / 1024:.0f} KB not embedded ({elapsed * 1000:.0f} ms)")
+    assert stats["lines_stripped"] >= 3 * (args.pages - 1), "running header/footer not stripped"
+    assert stats["chunks_dropped"] > 0, "repeated boilerplate chunks not skipped"
+    assert "acme" in indexed_terms(chunks), "the last copy of the running header must stay in the index"
+    print()
+
+    check_keeps("invoice pages (identifiers on the edges)", [
+        f"Invoice INV-{n:05d}\nCustomer ID: C-{n:04d}\n"
+        "Thank you for your business. Payment is due within thirty days of the invoice date.\n"
+        "Late payments incur a fee of two percent per month.\n"
+        f"Amount due: {400 + n} USD"
+        for n in range(1, 6)
+    ])
+    check_keeps("short pages of numbered items", [
+        "\n".join(f"Item {p * 10 + i}: part SKU-{p * 10 + i:04d}" for i in range(4)) for p in range(5)
+    ])
+    check_keeps("template chunks differing by number/total", [
+        f"Invoice INV-{n:05d} was issued to the customer for consulting services rendered during the "
+        f"quarter, covering design reviews, workshops and follow-up support. Total: {1000 + n} EUR."
+        for n in range(5)
+    ], chunk_size=200)
+    check_keeps("bench_pages FILLER fixture", ["".join(FILLER.format(n=p * 10 + i) for i in range(6)) for p in range(10)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Benchmark: local HTML extraction vs the reader proxy.
+
+Serves the saved pages in benchmarks/fixtures/html from a local server and
+times fetching + extracting each with html_extract (the Websites page's
+'Local' mode), reporting raw HTML size and extracted text size. It
+asserts that each fixture's main text is kept and its navigation,
+cookie banners, sidebars and footers are dropped (app_shell.html wraps
+its content in elements whose class/id merely contain furniture words),
+and that an oversized page stops downloading at the byte cap.
+
+The reader proxy cannot reach a local server, so the proxy column is only
+filled for live pages given with --urls (network required):
+
+    python benchmarks/bench_extract.py
+    python benchmarks/bench_extract.py --urls https://docs.python.org/3/library/json.html
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import threading
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import html_extract
+from webfetch import Fetcher
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+READER_PROXY_URL = os.environ.get("READER_PROXY_URL", "https://r.jina.ai/")
+CHUNK_SIZE = 64 << 10
+# fixture -> (text that must be extracted, page furniture that must not)
+EXPECTED = {
+    "docs_page.html": (["# Invoices API", "Section 6: Errors", "INV-00006", "Retry-After"],
+                       ["We use cookies", "All rights reserved", "Getting Started", "Privacy"]),
+    "blog_post.html": (["# How we closed the books faster", "By the Finance Team", "Step 12 of the rollout",
+                        "Weekly reconciliation"],
+                       ["Tweet", "Related post number", "Great write-up", "RSS", "Careers"]),
+    "news_divsoup.html": (["Council approves budget", "Paragraph 1 adds", "Paragraph 15 adds"],
+                          ["Category 0", "Advertisement"]),
+    "app_shell.html": (["# Expense policy", "above 25 EUR", "fifth working day"],
+                       ["We use cookies", "Quick links", "Holiday calendar", "Share on chat", "People"]),
+}
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=FIXTURES, **kwargs)
+
+    def do_GET(self):
+        if self.path == "/huge.html":
+            # ~20 MB page: the byte cap has to stop the download early
+            with open(os.path.join(FIXTURES, "docs_page.html"), "rb") as fh:
+                body = fh.read() * 2500
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            return
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+def timed(fn, repeat):
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings) * 1000
+
+
+def fetch_local(fetcher, url, max_bytes, max_chars=200_000, received=None):
+    """Locally extracted text of ``url``; ``received`` (a list) gets the bytes read"""
+    response = fetcher.get(url, stream=True)
+    if received is not None:
+        iter_content = response.iter_content
+
+        def counting(chunk_size):
+            for chunk in iter_content(chunk_size):
+                received.append(len(chunk))
+                yield chunk
+        response.iter_content = counting
+    try:
+        return html_extract.read_response(response, max_bytes=max_bytes, max_chars=max_chars, chunk_size=CHUNK_SIZE)
+    finally:
+        response.close()
+
+
+def check_fixture(name, text):
+    keep, drop = EXPECTED[name]
+    missing = [phrase for phrase in keep if phrase not in text]
+    leaked = [phrase for phrase in drop if phrase in text]
+    assert not missing, f"{name}: main text lost: {missing}"
+    assert not leaked, f"{name}: page furniture kept: {leaked}"
+
+
+def fetch_proxy(fetcher, url):
+    return fetcher.get(READER_PROXY_URL + url).text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--urls", nargs="*", default=[], help="live pages to also fetch through the reader proxy")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-bytes", type=int, default=2 << 20)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    fetcher = Fetcher(timeout=30)
+
+    print(f"{'page':<44}{'html KB':>9}{'local ms':>10}{'text KB':>9}{'proxy ms':>10}{'text KB':>9}")
+    pages = [(name, f"{base}/{name}") for name in sorted(os.listdir(FIXTURES)) if name.endswith(".html")]
+    pages += [("huge.html (capped)", f"{base}/huge.html")] + [(url, url) for url in args.urls]
+    for name, url in pages:
+        if name.startswith("huge"):
+            html_kb = os.path.getsize(os.path.join(FIXTURES, "docs_page.html")) * 2500 / 1024
+        else:
+            html_kb = len(fetcher.get(url).content) / 1024
+        text, local_ms = timed(lambda: fetch_local(fetcher, url, args.max_bytes), args.repeat)
+        if name in EXPECTED:
+            check_fixture(name, text)
+        proxy = f"{'-':>10}{'-':>9}"
+        if url in args.urls:
+            try:
+                proxy_text, proxy_ms = timed(lambda: fetch_proxy(fetcher, url), args.repeat)
+                proxy = f"{proxy_ms:>10.1f}{len(proxy_text) / 1024:>9.1f}"
+            except Exception as e:
+                proxy = f"{'failed: ' + type(e).__name__:>19}"
+        print(f"{name[:43]:<44}{html_kb:>9.1f}{local_ms:>10.1f}{len(text) / 1024:>9.1f}{proxy}")
+
+    # Extraction alone, without the HTTP round trip
+    print()
+    for name, _ in pages[:-1 - len(args.urls)]:
+        with open(os.path.join(FIXTURES, name), encoding="utf-8") as fh:
+            html = fh.read()
+        text, extract_ms = timed(lambda: html_extract.extract(html), args.repeat)
+        check_fixture(name, text)
+        print(f"extract {name:<36}{extract_ms:>10.2f} ms")
+
+    # The byte cap alone (no text cap) must stop the 20 MB download
+    received = []
+    fetch_local(fetcher, f"{base}/huge.html", args.max_bytes, max_chars=1 << 40, received=received)
+    assert sum(received) <= args.max_bytes + CHUNK_SIZE, f"read {sum(received)} bytes past the {args.max_bytes} byte cap"
+    print(f"\nhuge.html: read {sum(received) / 1024:.0f} KB of {html_kb:.0f} KB (cap {args.max_bytes / 1024:.0f} KB)")
+    print("ok")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""Headless page-level benchmark suite.
+
+Drives every page under pages/ with streamlit.testing.v1.AppTest against
+the offline stand-ins (fake chat model, deterministic embeddings, a local
+HTTP server instead of the reader proxy, generated PDFs). For each page it
+measures:
+
+  cold_start   first script run of a fresh AppTest
+  rerun        median rerun with --history messages already in the chat
+  question     median latency of one chat question (end-to-end script run)
+  ingest       PDF / website ingest until the page is usable; the Documents
+               page unlocks chat after its first indexed batch
+
+Results are compared against a stored baseline JSON. Any metric that gets
+slower than the baseline by more than --tolerance fails the run:
+
+    python benchmarks/bench_pages.py --save-baseline   # record benchmarks/baseline.json
+    python benchmarks/bench_pages.py                   # compare against it
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import statistics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES_DIR = os.path.join(ROOT, "pages")
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+FAKE_PROVIDER = "Fake (Offline Testing)"
+
+QUESTIONS = [
+    "What is the main topic?",
+    "Summarize the key points.",
+    "Which numbers are mentioned?",
+    "Who is the intended audience?",
+    "What should I read first?",
+]
+
+FILLER = (
+    "Section {n} describes invoice INV-{n:05d} and error code E{n:03d}. The policy requires "
+    "approval from the finance team before payment. Employees must keep receipts for seven "
+    "years and submit expenses within thirty days of purchase. "
+)
+
+
+# -------------------- Offline fixtures --------------------
+def make_pdf(pages):
+    """Build a minimal PDF with one text page per entry of ``pages``"""
+    def esc(text):
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        words, lines, line = text.split(), [], ""
+        for word in words:
+            if len(line) + len(word) > 90:
+                lines.append(line)
+                line = ""
+            line += word + " "
+        lines.append(line)
+        stream = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(f"({esc(l)}) '" for l in lines[:60]) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{off:010d} 00000 n \n" for off in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF".encode()
+    return bytes(out)
+
+
+def write_pdf_fixtures(directory, files, pages_per_file):
+    paths = []
+    for f in range(files):
+        pages = ["".join(FILLER.format(n=f * 1000 + p * 10 + i) for i in range(6)) for p in range(pages_per_file)]
+        path = os.path.join(directory, f"handbook_{f + 1}.pdf")
+        with open(path, "wb") as fh:
+            fh.write(make_pdf(pages))
+        paths.append(path)
+    return paths
+
+
+class FixtureSite(BaseHTTPRequestHandler):
+    """Serves deterministic page text for any path (stands in for the reader proxy)"""
+
+    def do_GET(self):
+        n = sum(map(ord, self.path)) % 997
+        body = ("# Fixture page " + self.path + "\n\n" + "".join(FILLER.format(n=n + i) for i in range(40))).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fixture_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureSite)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# -------------------- AppTest drivers --------------------
+def run_page_with_uploads(page_path, upload_paths):
+    """AppTest script: run a page with st.sidebar.file_uploader returning fixture files"""
+    import io
+    import os
+    import runpy
+    import streamlit as st
+
+    class FixtureUpload(io.BytesIO):
+        def __init__(self, path):
+            with open(path, "rb") as f:
+                data = f.read()
+            super().__init__(data)
+            self.name = os.path.basename(path)
+            self.size = len(data)
+            self.type = "application/pdf"
+
+    st.sidebar.file_uploader = lambda *args, **kwargs: [FixtureUpload(p) for p in upload_paths]
+    runpy.run_path(page_path, run_name="__main__")
+
+
+def page_path(prefix):
+    return next(os.path.join(PAGES_DIR, name) for name in sorted(os.listdir(PAGES_DIR)) if name.startswith(prefix))
+
+
+def new_app(prefix, timeout, uploads=None):
+    from streamlit.testing.v1 import AppTest
+
+    path = page_path(prefix)
+    if uploads is not None:
+        at = AppTest.from_function(run_page_with_uploads, args=(path, uploads), default_timeout=timeout)
+    else:
+        at = AppTest.from_file(path, default_timeout=timeout)
+    at.session_state["llm_provider_selection"] = FAKE_PROVIDER
+    at.session_state["internet_llm_provider_selection"] = "Fake"
+    return at
+
+
+def timed_run(at):
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"page raised: {at.exception[0].value}")
+    return elapsed
+
+
+def history(n):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"History message {i} " * 8} for i in range(n)]
+
+
+def bench_page(prefix, args, uploads=None, setup=None):
+    results = {"cold_start": timed_run(new_app(prefix, args.timeout, [] if uploads is not None else None))}
+
+    at = new_app(prefix, args.timeout, uploads)
+    if uploads is not None or setup is not None:
+        # RAG pages: first run with documents/websites is the ingest
+        if setup:
+            setup(at)
+        results["ingest"] = timed_run(at)
+    else:
+        at.run()
+
+    at.session_state["messages"] = history(args.history)
+    results["rerun"] = statistics.median(timed_run(at) for _ in range(args.reruns))
+
+    question_times = []
+    for question in QUESTIONS[:args.questions]:
+        at.chat_input[0].set_value(f"{question} ({prefix})")
+        question_times.append(timed_run(at))
+    results["question"] = statistics.median(question_times)
+    return results
+
+
+def run_suite(args):
+    os.environ.update({
+        "ENABLE_FAKE_LLM": "1",
+        "FAKE_EMBEDDINGS": "1",
+        "FAKE_LLM_TTFT": str(args.ttft),
+        "FAKE_LLM_TPS": str(args.tps),
+    })
+    server = start_fixture_server()
+    os.environ["READER_PROXY_URL"] = f"http://127.0.0.1:{server.server_port}/"
+
+    suite = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        pdfs = write_pdf_fixtures(tmp, args.pdf_files, args.pdf_pages)
+        websites = [f"https://docs.example.com/page-{i}" for i in range(args.websites)]
+
+        plan = [
+            ("1_", "basic", {}),
+            ("2_", "context", {}),
+            ("3_", "internet", {}),
+            ("4_", "documents", {"uploads": pdfs}),
+            ("5_", "sql", {}),
+            ("6_", "websites", {"setup": lambda at: at.session_state.__setitem__("websites", list(websites))}),
+        ]
+        for prefix, name, extra in plan:
+            if args.pages and name not in args.pages:
+                continue
+            suite[name] = bench_page(prefix, args, **extra)
+            print(f"{name:<10} " + "  ".join(f"{k}={v * 1000:8.1f}ms" for k, v in suite[name].items()))
+    server.shutdown()
+    return suite
+
+
+def compare(suite, baseline, tolerance):
+    regressions = []
+    print(f"\n{'page':<10}{'metric':<12}{'baseline ms':>14}{'current ms':>14}{'change':>10}")
+    for page, metrics in suite.items():
+        for metric, value in metrics.items():
+            base = baseline.get(page, {}).get(metric)
+            if base is None:
+                continue
+            change = (value - base) / base if base else 0.0
+            flag = "  <-- slower" if change > tolerance else ""
+            print(f"{page:<10}{metric:<12}{base * 1000:>14.1f}{value * 1000:>14.1f}{change:>+10.0%}{flag}")
+            if flag:
+                regressions.append((page, metric, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--pages", nargs="*", help="subset: basic context internet documents sql websites")
+    parser.add_argument("--history", type=int, default=50, help="chat messages already on screen for rerun timing")
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--pdf-files", type=int, default=3)
+    parser.add_argument("--pdf-pages", type=int, default=20)
+    parser.add_argument("--websites", type=int, default=5)
+    parser.add_argument("--ttft", type=float, default=0.0, help="fake model time to first token (s)")
+    parser.add_argument("--tps", type=float, default=500.0, help="fake model tokens per second")
+    parser.add_argument("--timeout", type=float, default=120.0, help="AppTest per-run timeout (s)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    suite = run_suite(args)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(suite, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline first.")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(suite, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+        sys.exit(1)
+    print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
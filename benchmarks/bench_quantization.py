@@ -0,0 +1,100 @@
+"""Benchmark: memory and recall of quantized NumpyVectorStore storage.
+
+Builds the store with float32, int8 and binary storage (optionally
+memory-mapping the full-precision vectors) and reports the Python heap
+held after the build, recall@k against exact float32 search and query
+latency. DocArrayInMemorySearch, the store the RAG pages used before, is
+measured the same way up to --docarray-max chunks. Heap sizes come from
+tracemalloc, so memory-mapped pages (reclaimable page cache) are not
+counted; they are reported as disk.
+
+    python benchmarks/bench_quantization.py --sizes 10000 100000
+"""
+import gc
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_vectorstore import LookupEmbeddings, build_numpy_store, synthetic_vectors
+
+CONFIGS = [
+    ("float32", {}),
+    ("int8", {"quantization": "int8"}),
+    ("binary", {"quantization": "binary"}),
+    ("int8+mmap", {"quantization": "int8", "mmap": True}),
+    ("binary+mmap", {"quantization": "binary", "mmap": True}),
+]
+
+
+def measure_build(build):
+    """``(store, heap MB, build s)``: heap still allocated once ``build`` returns"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = build()
+    build_s = time.perf_counter() - start
+    gc.collect()
+    heap, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return store, heap / 2 ** 20, build_s
+
+
+def run(store, n_queries, k):
+    results, timings = [], []
+    for i in range(n_queries):
+        start = time.perf_counter()
+        docs = store.similarity_search(f"query {i}", k=k)
+        timings.append(time.perf_counter() - start)
+        results.append({d.page_content for d in docs})
+    return results, statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--docarray-max", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'chunks':>9}{'storage':>24}{'heap MB':>10}{'disk MB':>9}{'build s':>9}"
+          f"{f'recall@{args.k}':>11}{'p50 ms':>9}")
+    for n in args.sizes:
+        chunks, queries = synthetic_vectors(n, args.queries)
+        texts = [f"chunk {i}" for i in range(n)]
+        embedding = LookupEmbeddings(chunks, queries)
+        exact = None
+
+        for name, options in CONFIGS:
+            options = dict(options)
+            with tempfile.TemporaryDirectory() as mmap_dir:
+                if options.pop("mmap", False):
+                    options["mmap_dir"] = mmap_dir
+                store, heap_mb, build_s = measure_build(
+                    lambda: build_numpy_store(texts, chunks, embedding, keyword_index=False, **options))
+                results, p50 = run(store, args.queries, args.k)
+                exact = exact or results
+                recall = statistics.mean(len(r & e) / len(e) for r, e in zip(results, exact))
+                disk_mb = store._matrix.nbytes / 2 ** 20 if options.get("mmap_dir") else 0.0
+                print(f"{n:>9}{name:>24}{heap_mb:>10.1f}{disk_mb:>9.1f}{build_s:>9.1f}{recall:>11.3f}{p50:>9.2f}")
+                del store
+
+        if n <= args.docarray_max:
+            from langchain_community.vectorstores import DocArrayInMemorySearch
+            store, heap_mb, build_s = measure_build(lambda: DocArrayInMemorySearch.from_texts(texts, embedding))
+            results, p50 = run(store, args.queries, args.k)
+            recall = statistics.mean(len(r & e) / len(e) for r, e in zip(results, exact))
+            print(f"{n:>9}{'DocArrayInMemorySearch':>24}{heap_mb:>10.1f}{0.0:>9.1f}{build_s:>9.1f}"
+                  f"{recall:>11.3f}{p50:>9.2f}")
+            del store
+
+
+if __name__ == "__main__":
+    main()
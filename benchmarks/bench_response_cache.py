@@ -0,0 +1,85 @@
+"""Benchmark: semantic response cache lookups, and the near-misses it must not serve.
+
+Fills a utils.ResponseCache with questions and times exact and semantic
+lookups. The embedding is a hashed bag of words that ignores digits, a
+stand-in for real embedding models, which barely separate prompts that
+differ only in a number. The script then checks that rephrased questions
+still hit and that questions differing only in an amount or identifier
+miss instead of getting the other question's answer.
+
+    python benchmarks/bench_response_cache.py --entries 500
+"""
+import os
+import re
+import sys
+import time
+import zlib
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from utils import ResponseCache
+
+DIMENSIONS = 256
+NAMESPACE = "bench"
+
+# (cached question, asked question, should the cached answer be served)
+CASES = [
+    ("How do I reset my password?", "how do I reset my password please", True),
+    ("What is the status of INV-00042?", "what is the status of INV-00042 please", True),
+    ("Convert 15 USD to EUR", "convert 50 USD to EUR", False),
+    ("What is the status of INV-00042?", "What is the status of INV-00043?", False),
+    ("Summarize chapter 3", "Summarize chapter 4", False),
+    ("What was revenue in 2023?", "What was revenue?", False),
+]
+
+
+def embed(text):
+    """Hashed bag of words, blind to digits"""
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    for word in re.findall(r"[a-z]+", text.lower()):
+        vector[zlib.crc32(word.encode()) % DIMENSIONS] += 1.0
+    return vector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=500)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    cache = ResponseCache(embed_fn=embed, max_entries=args.entries)
+    topics = ["refund", "invoice", "password", "shipping", "warranty", "contract", "payroll", "travel"]
+    for i in range(args.entries):
+        cache.put(NAMESPACE, f"what is the {topics[i % len(topics)]} policy for team {i}", f"answer {i}")
+
+    for label, make in [
+        ("exact", lambda i: f"what is the {topics[i % len(topics)]} policy for team {i}"),
+        ("semantic", lambda i: f"what is the {topics[i % len(topics)]} policy for team {i} please"),
+        ("miss", lambda i: f"what is the {topics[i % len(topics)]} policy for team {args.entries + i}"),
+    ]:
+        prompts = [make(i) for i in range(args.lookups)]
+        start = time.perf_counter()
+        answers = [cache.get(NAMESPACE, prompt) for prompt in prompts]
+        per_lookup = (time.perf_counter() - start) / len(prompts) * 1000
+        served = sum(answer is not None for answer in answers)
+        print(f"{label:<10}{per_lookup:>8.3f} ms/lookup   {served}/{len(prompts)} served")
+        assert served == (0 if label == "miss" else len(prompts)), f"{label} lookups served {served}/{len(prompts)}"
+    print()
+
+    for cached, asked, should_hit in CASES:
+        cache = ResponseCache(embed_fn=embed)
+        cache.put(NAMESPACE, cached, f"answer to {cached}")
+        answer = cache.get(NAMESPACE, asked)
+        verdict = "hit " if answer is not None else "miss"
+        print(f"ok  {verdict}  {asked!r:<44} (cached {cached!r})")
+        assert (answer is not None) == should_hit, (
+            f"{asked!r} {'missed' if should_hit else 'was served the answer to'} {cached!r}"
+        )
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Benchmark: serial vs concurrent website scraping against a local stand-in server.
+
+The stand-in answers every path after --delay seconds, fails paths
+containing 'broken' with HTTP 500 and stalls paths containing 'slow' past
+the deadline; the script asserts that the healthy pages come back
+within the deadline and the failing and stalled ones are reported. The
+serial path is the old one-requests.get-per-URL loop. A last run checks that a batch queued behind one host's ``--per-host`` limit
+(the reader proxy case) leaves pool threads free for other hosts.
+
+    python benchmarks/bench_scrape.py --urls 10 --delay 0.5
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from webfetch import Fetcher
+
+
+def make_handler(delay, stall):
+    class StandIn(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(stall if "slow" in self.path else delay)
+            status = 500 if "broken" in self.path else 200
+            body = (f"# Page {self.path}\n\n" + "Some text. " * 300).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up on a stalled page
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    return StandIn
+
+
+def serial(urls, timeout):
+    ok = 0
+    for url in urls:
+        try:
+            res = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=timeout)
+            res.raise_for_status()
+            ok += 1
+        except Exception:
+            pass
+    return ok
+
+
+def concurrent(fetcher, urls, deadline_s):
+    return sum(error is None for error in fetch_batch(fetcher, urls, deadline_s).values())
+
+
+def fetch_batch(fetcher, urls, deadline_s):
+    """``{url: error}`` of one deadline-bound batch"""
+    return {url: error for url, _, error in fetcher.fetch_all(urls, time.monotonic() + deadline_s)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--urls", type=int, default=10)
+    parser.add_argument("--delay", type=float, default=0.5, help="server response time per page (s)")
+    parser.add_argument("--deadline", type=float, default=3.0, help="overall scrape budget (s)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--per-host", type=int, default=4)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.delay, stall=args.deadline * 2))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    healthy = [f"{base}/page-{i}" for i in range(args.urls)]
+    mixed = healthy[:-2] + [f"{base}/broken", f"{base}/slow"]
+    fetcher = Fetcher(max_workers=args.workers, per_host=args.per_host)
+
+    print(f"{'urls':>14}{'mode':>12}{'ok':>5}{'wall s':>9}")
+    for label, urls in (("all healthy", healthy), ("1 err 1 stall", mixed)):
+        for mode, run in (("serial", lambda: serial(urls, timeout=args.deadline * 2 + 1)),
+                          ("concurrent", lambda: concurrent(fetcher, urls, args.deadline))):
+            start = time.perf_counter()
+            ok = run()
+            print(f"{label:>14}{mode:>12}{ok:>5}{time.perf_counter() - start:>9.2f}")
+
+    # Every URL is reported: healthy pages in time, the failing and the stalled one as errors
+    start = time.perf_counter()
+    errors = fetch_batch(fetcher, mixed, args.deadline)
+    elapsed = time.perf_counter() - start
+    assert set(errors) == set(mixed), "some URLs were never reported"
+    assert all(errors[url] is None for url in healthy[:-2]), \
+        f"healthy pages failed: {[url for url in healthy[:-2] if errors[url] is not None]}"
+    assert isinstance(errors[f"{base}/broken"], requests.HTTPError), f"HTTP 500 not reported: {errors[f'{base}/broken']!r}"
+    assert isinstance(errors[f"{base}/slow"], TimeoutError), f"stalled page not reported: {errors[f'{base}/slow']!r}"
+    assert elapsed < args.deadline + 0.5, f"the batch overran its {args.deadline}s deadline ({elapsed:.2f}s)"
+    print(f"\nmixed batch: {len(healthy) - 2} healthy ok, broken -> {type(errors[f'{base}/broken']).__name__}, "
+          f"slow -> {type(errors[f'{base}/slow']).__name__}, in {elapsed:.2f}s (deadline {args.deadline}s)")
+
+    # One host saturated with 4x the pool's worth of URLs; another host's batch must not wait for it
+    other = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(0.0, stall=0.0))
+    threading.Thread(target=other.serve_forever, daemon=True).start()
+    busy = threading.Thread(target=lambda: list(fetcher.fetch_all([f"{base}/queued-{i}" for i in range(4 * args.workers)])))
+    busy.start()
+    time.sleep(0.05)
+    start = time.perf_counter()
+    other_ok = concurrent(fetcher, [f"http://127.0.0.1:{other.server_port}/page-{i}" for i in range(4)], args.deadline)
+    other_s = time.perf_counter() - start
+    busy.join()
+    print(f"other host while one host is saturated: {other_ok}/4 ok in {other_s:.2f}s")
+    assert other_ok == 4 and other_s < args.delay, "a saturated host held pool threads other hosts needed"
+    other.shutdown()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Benchmark: identical concurrent questions coalesced into one upstream call.
+
+N threads ask a slow fake chat model the same question at the same time
+through utils.coalesced_stream. Each thread streams into its own
+StreamHandler. The script checks that the model was called exactly once
+and that every handler received the full answer. A second round has the
+session that started the call stop reading after a few tokens (a rerun or
+stop in the UI): the other sessions must still get the full answer from
+that same call, and a call nobody reads any more must be cut short.
+
+    python benchmarks/bench_single_flight.py --sessions 25
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from typing import Any, Iterator, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+import utils
+from streaming import StreamHandler
+
+ANSWER = "Shared links get the same answer, streamed once and replayed to every waiting session."
+
+
+class SlowCountingModel(BaseChatModel):
+    """Fake chat model that streams slowly and counts upstream calls"""
+
+    token_delay: float = 0.02
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-counting"
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        self.calls += 1
+        for word in ANSWER.split(" "):
+            time.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = "".join(c.message.content for c in self._stream(messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+class NullContainer:
+    def markdown(self, text):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=25)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    model = SlowCountingModel(token_delay=args.token_delay)
+    coalescer = utils.SingleFlight()
+    messages = [HumanMessage(content="What does the shared link say?")]
+    key = utils.flight_key(model, messages)
+    handlers = [StreamHandler(NullContainer()) for _ in range(args.sessions)]
+    barrier = threading.Barrier(args.sessions)
+
+    def session(handler):
+        barrier.wait()
+        for token in coalescer.stream(key, lambda: (c.content for c in model.stream(messages))):
+            handler.on_llm_new_token(token)
+        handler.on_llm_end(None)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(h,)) for h in handlers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    assert model.calls == 1, f"expected exactly one upstream call, got {model.calls}"
+    assert all(h.text.strip() == ANSWER for h in handlers)
+    print(f"{args.sessions} concurrent sessions -> {model.calls} upstream call "
+          f"({coalescer.coalesced_calls} coalesced) in {elapsed:.2f}s")
+
+    # The first session walks away mid-stream; the others joined its call
+    model = SlowCountingModel(token_delay=args.token_delay)
+    produced = []
+
+    def producer():
+        for chunk in model.stream(messages):
+            produced.append(chunk.content)
+            yield chunk.content
+
+    first = coalescer.stream(key, producer)
+    for _ in range(3):
+        next(first)
+    handlers = [StreamHandler(NullContainer()) for _ in range(args.sessions - 1)]
+    threads = [threading.Thread(target=session, args=(h,)) for h in handlers]
+    barrier = threading.Barrier(len(handlers))
+    for t in threads:
+        t.start()
+    while coalescer.coalesced_calls < 2 * args.sessions - 2:
+        time.sleep(0.001)
+    first.close()
+    for t in threads:
+        t.join()
+    assert model.calls == 1, f"expected the abandoned call to be shared, got {model.calls} upstream calls"
+    assert all(h.text.strip() == ANSWER for h in handlers), "followers lost the answer when the first session left"
+
+    # Nobody left reading: the upstream call stops early
+    model = SlowCountingModel(token_delay=args.token_delay)
+    produced.clear()
+    only = coalescer.stream(key, producer)
+    next(only)
+    only.close()
+    time.sleep(args.token_delay * 5)
+    assert len(produced) < len(ANSWER.split(" ")), "an unread call kept streaming to the end"
+    print(f"first session left after 3 tokens -> {len(handlers)} others still got the full answer; "
+          f"unread call stopped after {len(produced)} token(s)")
+
+
+if __name__ == "__main__":
+    main()
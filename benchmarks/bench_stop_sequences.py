@@ -0,0 +1,107 @@
+"""Benchmark: generation-time stop sequences vs. post-hoc cleanup.
+
+Simulates a small local model (TinyLlama-style) that answers and then keeps
+hallucinating "Human:"/"AI:" turns until its output budget runs out. The
+model honours ``stop`` and ``num_predict`` the way Ollama does server-side,
+so the numbers show how many tokens (and how much decode time) the
+GENERATION_LIMITS in utils.py save over cleaning the full output afterwards.
+
+    python benchmarks/bench_stop_sequences.py
+"""
+import os
+import sys
+import time
+import argparse
+from typing import Any, Iterator, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from streaming import clean_llm_response
+
+ANSWER = "The capital of France is Paris. It is known for the Eiffel Tower and the Louvre.\n"
+HALLUCINATED_TURN = (
+    "Human: What about Germany?\nAI: The capital of Germany is Berlin.\n"
+    "Human: And Italy?\nAI: Rome is the capital of Italy.\n"
+)
+
+
+class RamblingLocalModel(BaseChatModel):
+    """Fake local model: one real answer followed by endless fake turns"""
+
+    token_delay: float = 0.002
+    num_predict: int = 512
+    stop: Optional[List[str]] = None
+    generated_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "rambling-local"
+
+    def _tokens(self) -> Iterator[str]:
+        text = ANSWER
+        while True:
+            for word in text.split(" "):
+                yield word + " "
+            text = HALLUCINATED_TURN
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        stop = stop or self.stop or []
+        output = ""
+        for count, token in enumerate(self._tokens(), 1):
+            if count > self.num_predict:
+                return
+            time.sleep(self.token_delay)  # simulated decode cost
+            self.generated_tokens += 1
+            output += token
+            hit = next((s for s in stop if s in output), None)
+            if hit:
+                # Server-side stop: the stop sequence itself is never emitted
+                tail = output.index(hit) - (len(output) - len(token))
+                if tail > 0:
+                    yield ChatGenerationChunk(message=AIMessageChunk(content=token[:tail]))
+                return
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text = "".join(c.message.content for c in self._stream(messages, stop=stop))
+        return ChatResult(generations=[ChatGeneration(message=AIMessageChunk(content=text))])
+
+
+def run(model):
+    start = time.perf_counter()
+    raw = "".join(chunk.content for chunk in model.stream([HumanMessage(content="Capital of France?")]))
+    answer = clean_llm_response(raw)
+    return answer, model.generated_tokens, time.perf_counter() - start
+
+
+def main():
+    import utils
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--token-delay", type=float, default=0.002,
+                        help="simulated seconds per decoded token")
+    parser.add_argument("--uncapped-tokens", type=int, default=512,
+                        help="output budget of the cleanup-only path")
+    args = parser.parse_args()
+
+    limits = utils.GENERATION_LIMITS["ollama"]
+    cleanup_only = RamblingLocalModel(token_delay=args.token_delay, num_predict=args.uncapped_tokens)
+    with_stops = RamblingLocalModel(token_delay=args.token_delay, **limits)
+
+    before = run(cleanup_only)
+    after = run(with_stops)
+    assert before[0] == after[0], (before[0], after[0])
+
+    print(f"{'path':<22}{'generated tokens':>18}{'wall time (s)':>16}")
+    print(f"{'cleanup only':<22}{before[1]:>18}{before[2]:>16.3f}")
+    print(f"{'stop sequences':<22}{after[1]:>18}{after[2]:>16.3f}")
+    print(f"\nfinal answer identical: {after[0]!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Micro-benchmark: container renders per 1k streamed tokens.
+
+Compares the old render-every-token behaviour with the buffered
+StreamHandler flush policy. Run from the repo root:
+
+    python benchmarks/bench_stream_render.py
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from streaming import StreamHandler
+
+
+class CountingContainer:
+    """Stand-in for st.empty() that counts renders and rendered bytes"""
+
+    def __init__(self):
+        self.calls = 0
+        self.rendered_chars = 0
+        self.last = ""
+
+    def markdown(self, text):
+        self.calls += 1
+        self.rendered_chars += len(text)
+        self.last = text
+
+
+def fake_tokens(n, token="lorem "):
+    return [token] * n
+
+
+def run_unbuffered(tokens):
+    """Previous behaviour: re-render the whole text on every token"""
+    container = CountingContainer()
+    text = ""
+    start = time.perf_counter()
+    for token in tokens:
+        text += token
+        container.markdown(text)
+    return container, time.perf_counter() - start
+
+
+def run_buffered(tokens, token_delay, **policy):
+    container = CountingContainer()
+    handler = StreamHandler(container, **policy)
+    start = time.perf_counter()
+    for token in tokens:
+        if token_delay:
+            time.sleep(token_delay)
+        handler.on_llm_new_token(token)
+    handler.on_llm_end(None)
+    assert container.last == "".join(tokens)
+    return container, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--token-delay", type=float, default=0.005,
+                        help="seconds between tokens (gpt-4o streams roughly 100-200 tok/s)")
+    parser.add_argument("--flush-interval", type=float, default=0.05)
+    parser.add_argument("--flush-chars", type=int, default=64)
+    args = parser.parse_args()
+
+    tokens = fake_tokens(args.tokens)
+    per_1k = 1000 / args.tokens
+
+    before, before_s = run_unbuffered(tokens)
+    after, after_s = run_buffered(
+        tokens, args.token_delay,
+        flush_interval=args.flush_interval, flush_chars=args.flush_chars,
+    )
+
+    print(f"{'policy':<28}{'renders/1k tok':>16}{'chars sent/1k tok':>20}")
+    print(f"{'per-token (before)':<28}{before.calls * per_1k:>16.0f}{before.rendered_chars * per_1k:>20.0f}")
+    label = f"buffered {args.flush_interval * 1000:.0f}ms/{args.flush_chars}ch"
+    print(f"{label:<28}{after.calls * per_1k:>16.0f}{after.rendered_chars * per_1k:>20.0f}")
+    print(f"\nhandler overhead: before {before_s * 1000:.1f} ms, after {after_s * 1000:.1f} ms "
+          f"(after includes {args.token_delay * args.tokens * 1000:.0f} ms simulated token delay)")
+
+
+if __name__ == "__main__":
+    main()
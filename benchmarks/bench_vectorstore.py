@@ -0,0 +1,120 @@
+"""Benchmark: NumpyVectorStore vs DocArrayInMemorySearch.
+
+Builds each store from synthetic clustered 384-d vectors (the bge-small
+dimension) and times index build, top-k similarity search and MMR search.
+Embeddings are precomputed, so only the vector store itself is measured.
+DocArrayInMemorySearch is slow to build, so it is only run up to
+--docarray-max chunks.
+
+    python benchmarks/bench_vectorstore.py --sizes 1000 100000 1000000
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from vectorstore import NumpyVectorStore
+
+DIM = 384
+
+
+class LookupEmbeddings(Embeddings):
+    """Returns precomputed vectors for texts of the form 'chunk <i>' / 'query <i>'"""
+
+    def __init__(self, chunks, queries):
+        self.chunks = chunks
+        self.queries = queries
+
+    def embed_documents(self, texts):
+        return self.chunks[[int(t.split()[1]) for t in texts]].tolist()
+
+    def embed_documents_array(self, texts):
+        return self.chunks[[int(t.split()[1]) for t in texts]]
+
+    def embed_query(self, text):
+        return self.queries[int(text.split()[1])].tolist()
+
+
+def synthetic_vectors(n, n_queries, seed=0):
+    """Clustered vectors, closer to real chunk embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(16, n // 500), DIM)).astype(np.float32)
+    chunks = np.empty((n, DIM), dtype=np.float32)
+    for start in range(0, n, 100_000):
+        stop = min(n, start + 100_000)
+        labels = rng.integers(len(centers), size=stop - start)
+        chunks[start:stop] = centers[labels] + 0.6 * rng.standard_normal((stop - start, DIM), dtype=np.float32)
+    queries = centers[rng.integers(len(centers), size=n_queries)] + 0.6 * rng.standard_normal((n_queries, DIM), dtype=np.float32)
+    return chunks, queries
+
+
+def build_numpy_store(texts, chunks, embedding, batch_size=50_000, **kwargs):
+    """Insert in batches, the way the pages add chunks as they are embedded"""
+    store = NumpyVectorStore(embedding, initial_capacity=len(texts), **kwargs)
+    for start in range(0, len(texts), batch_size):
+        store.add_embeddings(texts[start:start + batch_size], chunks[start:start + batch_size])
+    return store
+
+
+def time_queries(search, n_queries):
+    timings = []
+    for i in range(n_queries):
+        start = time.perf_counter()
+        search(f"query {i}")
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), sorted(timings)[int(0.95 * (len(timings) - 1))]
+
+
+def bench_store(name, build, n_queries, k, fetch_k):
+    start = time.perf_counter()
+    store = build()
+    build_s = time.perf_counter() - start
+    sim = time_queries(lambda q: store.similarity_search(q, k=k), n_queries)
+    mmr = time_queries(lambda q: store.max_marginal_relevance_search(q, k=k, fetch_k=fetch_k), n_queries)
+    return store, {"store": name, "build_s": build_s, "sim": sim, "mmr": mmr}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--docarray-max", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'chunks':>9} {'store':<24}{'build s':>9}{'sim p50 ms':>12}{'sim p95 ms':>12}{'mmr p50 ms':>12}{'mmr p95 ms':>12}")
+    for n in args.sizes:
+        chunks, queries = synthetic_vectors(n, args.queries)
+        embedding = LookupEmbeddings(chunks, queries)
+        texts = [f"chunk {i}" for i in range(n)]
+        builds = [("NumpyVectorStore", lambda: build_numpy_store(texts, chunks, embedding))]
+        if n <= args.docarray_max:
+            from langchain_community.vectorstores import DocArrayInMemorySearch
+            builds.append(("DocArrayInMemorySearch", lambda: DocArrayInMemorySearch.from_texts(texts, embedding)))
+
+        reference = None
+        for name, build in builds:
+            store, r = bench_store(name, build, args.queries, args.k, args.fetch_k)
+            print(f"{n:>9} {name:<24}{r['build_s']:>9.2f}"
+                  f"{r['sim'][0] * 1000:>12.2f}{r['sim'][1] * 1000:>12.2f}"
+                  f"{r['mmr'][0] * 1000:>12.2f}{r['mmr'][1] * 1000:>12.2f}")
+            # Both stores must return the same neighbours
+            top = [[d.page_content for d in store.similarity_search(f"query {i}", k=args.k)] for i in range(5)]
+            if reference is None:
+                reference = top
+            elif top != reference:
+                print(f"{'':>9} warning: {name} top-{args.k} differs from NumpyVectorStore")
+            del store
+        if builds:
+            print(f"{'':>9} matrix memory: {n * DIM * 4 / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
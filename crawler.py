@@ -0,0 +1,207 @@
+"""Polite same-site crawler feeding pages to a callback as they arrive."""
+import time
+import logging
+import threading
+from collections import deque
+from urllib.parse import urldefrag, urlsplit
+from urllib.robotparser import RobotFileParser
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import html_extract
+from embedding_cache import text_hash
+
+logger = logging.getLogger('Langchain-Chatbot')
+
+# Links to these are never pages worth indexing
+SKIP_EXTENSIONS = frozenset(
+    ".pdf .zip .gz .tar .tgz .png .jpg .jpeg .gif .svg .webp .ico .css .js .json .xml .rss .mp3 .mp4 .webm .avi "
+    ".woff .woff2 .ttf .exe .dmg .apk".split()
+)
+
+
+def site_of(url):
+    """Host a crawl stays on; ``www.`` is ignored"""
+    host = urlsplit(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def normalize_url(url):
+    """Crawl key of a link: no fragment, no trailing slash on the path; None if not crawlable"""
+    url, _ = urldefrag(url)
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        return None
+    path = parts.path or "/"
+    if any(path.lower().endswith(ext) for ext in SKIP_EXTENSIONS):
+        return None
+    if len(path) > 1:
+        path = path.rstrip("/")
+    return parts._replace(path=path, netloc=parts.netloc.lower()).geturl()
+
+
+class Crawler:
+    """Breadth-first crawl of the sites of ``seeds``, in a background thread.
+
+    Follows links on the seeds' own hosts up to ``max_depth`` hops and
+    ``max_pages`` pages. At most ``per_host`` pages of a host are fetched
+    at once, starting at least ``delay`` seconds apart (or the site's
+    robots.txt Crawl-delay, if longer). Pages disallowed by robots.txt are
+    skipped; the seeds themselves were asked for explicitly and are always
+    fetched. Pages whose extracted text was already seen (mirrors, index.html
+    aliases) are not passed on.
+
+    Every new page is handed to ``on_page(url, text, depth)`` from the
+    crawl thread as soon as it arrives; a non-None return value is kept in
+    ``results[url]``.
+    """
+
+    def __init__(self, fetcher, seeds, on_page, max_depth=2, max_pages=50, per_host=2, delay=1.0,
+                 respect_robots=True, max_bytes=2 << 20, max_chars=200_000):
+        self.fetcher = fetcher
+        self.seeds = [url for url in map(normalize_url, seeds) if url]
+        self.on_page = on_page
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.per_host = per_host
+        self.delay = delay
+        self.respect_robots = respect_robots
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.results = {}
+        self.pages_fetched = 0
+        self.pages_skipped = 0
+        self.queued = 0
+        self.error = None
+        self._sites = {site_of(url) for url in self.seeds}
+        self._robots = {}
+        self._active = {}
+        self._next_start = {}
+        self._hashes = set()
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._guard, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    @property
+    def started(self):
+        return self._thread.ident is not None
+
+    @property
+    def done(self):
+        return not self._thread.is_alive()
+
+    def progress(self):
+        """``(pages indexed, pages fetched, pages queued)`` so far"""
+        with self._lock:
+            return len(self.results), self.pages_fetched, self.queued
+
+    # ---- politeness ----
+    def _robots_for(self, url):
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if origin not in self._robots:
+            robots = RobotFileParser()
+            try:
+                response = self.fetcher.get(origin + "/robots.txt", time.monotonic() + 10)
+                robots.parse(response.text.splitlines())
+            except Exception as e:
+                status = getattr(getattr(e, "response", None), "status_code", None)
+                if status is not None and 400 <= status < 500:
+                    robots.allow_all = True
+                else:
+                    # Unreachable or failing robots.txt: only the seeds are fetched
+                    robots.disallow_all = True
+            self._robots[origin] = robots
+        return self._robots[origin]
+
+    def _allowed(self, url, depth):
+        if depth == 0 or not self.respect_robots:
+            return True
+        return self._robots_for(url).can_fetch(self.fetcher.session.headers.get("User-Agent", "*"), url)
+
+    def _host_delay(self, url):
+        delay = self.delay
+        if self.respect_robots:
+            crawl_delay = self._robots_for(url).crawl_delay(self.fetcher.session.headers.get("User-Agent", "*"))
+            delay = max(delay, float(crawl_delay or 0))
+        return delay
+
+    # ---- crawl ----
+    def _fetch(self, url):
+        response = self.fetcher.get(url, stream=True)
+        try:
+            return response.url, *html_extract.read_page(response, self.max_bytes, self.max_chars)
+        finally:
+            response.close()
+
+    def _guard(self):
+        try:
+            self._run()
+        except Exception as e:
+            self.error = e
+            logger.exception("Crawl failed")
+
+    def _run(self):
+        frontier = deque((url, 0) for url in dict.fromkeys(self.seeds))
+        seen = set(self.seeds)
+        in_flight = {}
+        while (frontier or in_flight) and not self._cancelled.is_set():
+            # Start every queued page whose host has a free slot and whose delay has passed
+            now = time.monotonic()
+            for _ in range(len(frontier)):
+                if self.pages_fetched + len(in_flight) >= self.max_pages:
+                    frontier.clear()
+                    break
+                url, depth = frontier.popleft()
+                host = urlsplit(url).netloc
+                if not self._allowed(url, depth):
+                    self.pages_skipped += 1
+                    continue
+                if self._active.get(host, 0) >= self.per_host or self._next_start.get(host, 0) > now:
+                    frontier.append((url, depth))
+                    continue
+                self._active[host] = self._active.get(host, 0) + 1
+                self._next_start[host] = now + self._host_delay(url)
+                in_flight[self.fetcher.submit(self._fetch, url, host=host)] = (url, depth)
+            with self._lock:
+                self.queued = len(frontier)
+
+            done, _ = wait(in_flight, timeout=0.1, return_when=FIRST_COMPLETED) if in_flight else (set(), None)
+            if not in_flight:
+                time.sleep(0.05)
+            for future in done:
+                url, depth = in_flight.pop(future)
+                host = urlsplit(url).netloc
+                self._active[host] -= 1
+                with self._lock:
+                    self.pages_fetched += 1
+                try:
+                    final_url, text, links = future.result()
+                except Exception as e:
+                    logger.info(f"Crawl: skipping {url}: {e}")
+                    continue
+                if self._cancelled.is_set():
+                    return
+                digest = text_hash(text)
+                if text.strip() and digest not in self._hashes:
+                    self._hashes.add(digest)
+                    result = self.on_page(url, text, depth)
+                    if result is not None:
+                        with self._lock:
+                            self.results[url] = result
+                if depth >= self.max_depth or site_of(final_url) not in self._sites:
+                    continue
+                for link in links:
+                    link = normalize_url(link)
+                    if link and link not in seen and site_of(link) in self._sites:
+                        seen.add(link)
+                        frontier.append((link, depth + 1))
@@ -0,0 +1,186 @@
+"""Drop repeated page furniture and near-duplicate chunks before they are embedded.
+
+Everything is scoped per source (one PDF, one URL): a file's chunks never
+depend on another file, so removing a file from an index cannot lose text
+another file relied on.
+"""
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+from langchain_core.documents import Document
+
+from hybrid import tokenize
+
+MERSENNE_PRIME = (1 << 61) - 1
+# Page counters: "Page 3 of 12", "p. 3", or a line that is only "3", "3 / 12" or "- 3 -"
+PAGE_COUNTER = re.compile(r"\b(?:page|pg\.?|p\.)\s*\d+(?:\s*(?:of|/)\s*\d+)?\b")
+BARE_COUNTER = re.compile(r"^[-–—\s]*\d+(?:\s*(?:of|/)\s*\d+)?[-–—\s]*$")
+
+
+def normalize_line(line):
+    """Comparison key of a line: case and spacing ignored.
+
+    Only page counters have their numbers ignored, so "Page 3 of 12"
+    matches "Page 4 of 12" while lines quoting different invoice numbers,
+    IDs or amounts stay apart.
+    """
+    key = " ".join(line.lower().split())
+    if BARE_COUNTER.match(key):
+        return re.sub(r"\d+", "#", key)
+    return PAGE_COUNTER.sub(lambda m: re.sub(r"\d+", "#", m.group()), key)
+
+
+def identifiers(text):
+    """Terms of ``text`` that contain a digit (invoice numbers, codes, amounts)"""
+    return frozenset(term for term in tokenize(text) if any(c.isdigit() for c in term))
+
+
+def shingles(text, size=5):
+    """Set of ``size``-word shingles of ``text``"""
+    words = text.lower().split()
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHashLSH:
+    """Near-duplicate detector: MinHash signatures bucketed by LSH bands.
+
+    ``num_perm`` hashes in ``bands`` bands; documents sharing a band become
+    candidates and are duplicates when their estimated Jaccard similarity of
+    word shingles is at least ``threshold`` and they have the same ``tag``.
+    """
+
+    def __init__(self, num_perm=64, bands=16, threshold=0.95, seed=0):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.threshold = threshold
+        self._signatures = []
+        self._tags = []
+        self._buckets = defaultdict(list)
+
+    def signature(self, text):
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles(text)), dtype=np.uint64)
+        # a < 2**31 and hashes < 2**32, so a * h + b cannot overflow uint64
+        return ((np.outer(hashes, self.a) + self.b) % MERSENNE_PRIME).min(axis=0)
+
+    def add_if_new(self, text, tag=None):
+        """Index ``text`` and return True, or return False if it near-duplicates an indexed text.
+
+        Texts with different ``tag`` values are never duplicates of each other.
+        """
+        signature = self.signature(text)
+        keys = [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+        seen = set()
+        for key in keys:
+            for candidate in self._buckets.get(key, ()):
+                if candidate not in seen:
+                    seen.add(candidate)
+                    if self._tags[candidate] == tag and np.mean(self._signatures[candidate] == signature) >= self.threshold:
+                        return False
+        number = len(self._signatures)
+        self._signatures.append(signature)
+        self._tags.append(tag)
+        for key in keys:
+            self._buckets[key].append(number)
+        return True
+
+
+class ChunkFilter:
+    """Strips page headers/footers and drops near-duplicate chunks, per source.
+
+    A line within ``edge_lines`` of the top or bottom of a page (a third of
+    the page at most) is page furniture once it has been seen there on
+    ``min_repeats`` pages of the same source. It is only ever removed from
+    those edges, and one copy is always kept, so a repeated line still
+    has its text in the index. Pages may arrive in batches (as the ingest
+    pipeline parses them), so furniture is learned as they stream in.
+
+    Chunks are near-duplicates only when they also quote the same
+    identifiers (terms with digits, see ``identifiers``): template text
+    around a different invoice number or amount is kept. Counters of what
+    was removed feed ``report``.
+    """
+
+    def __init__(self, boilerplate=True, near_duplicates=True, min_repeats=3, edge_lines=4, threshold=0.95):
+        self.boilerplate = boilerplate
+        self.near_duplicates = near_duplicates
+        self.min_repeats = min_repeats
+        self.edge_lines = edge_lines
+        self.threshold = threshold
+        self._line_pages = defaultdict(lambda: defaultdict(int))
+        # Edge lines already passed on at least once, per source
+        self._lines_kept = defaultdict(set)
+        self._lsh = defaultdict(lambda: MinHashLSH(threshold=self.threshold))
+        self.lines_stripped = 0
+        self.chunks_seen = 0
+        self.chunks_dropped = 0
+        self.chars_saved = 0
+
+    def _edge_positions(self, lines):
+        """Indexes of the non-blank lines at the top and bottom of a page"""
+        content = [i for i, line in enumerate(lines) if line.strip()]
+        n = min(self.edge_lines, len(content) // 3)
+        return content[:n] + content[len(content) - n:] if n else []
+
+    def clean_pages(self, key, pages):
+        """Copies of ``pages`` (Documents of source ``key``) without their page furniture"""
+        if not self.boilerplate:
+            return pages
+        counts = self._line_pages[key]
+        kept_once = self._lines_kept[key]
+        page_edges = []
+        for page in pages:
+            lines = page.page_content.splitlines()
+            edges = {i: normalize_line(lines[i]) for i in self._edge_positions(lines)}
+            page_edges.append((lines, edges))
+            for norm in set(edges.values()):
+                counts[norm] += 1
+
+        cleaned = []
+        for page, (lines, edges) in zip(pages, page_edges):
+            drop = set()
+            for i, norm in edges.items():
+                if counts[norm] >= self.min_repeats and norm in kept_once:
+                    drop.add(i)
+                else:
+                    kept_once.add(norm)
+            if not drop:
+                cleaned.append(page)
+                continue
+            self.lines_stripped += len(drop)
+            self.chars_saved += sum(len(lines[i]) for i in drop)
+            kept = [line for i, line in enumerate(lines) if i not in drop]
+            cleaned.append(Document(page_content="\n".join(kept), metadata=page.metadata))
+        return cleaned
+
+    def filter_chunks(self, key, chunks):
+        """``chunks`` of source ``key`` without near-duplicates of its earlier chunks"""
+        self.chunks_seen += len(chunks)
+        if not self.near_duplicates:
+            return chunks
+        lsh = self._lsh[key]
+        kept = []
+        for chunk in chunks:
+            if lsh.add_if_new(chunk.page_content, identifiers(chunk.page_content)):
+                kept.append(chunk)
+            else:
+                self.chunks_dropped += 1
+                self.chars_saved += len(chunk.page_content)
+        return kept
+
+    def report(self, embed_seconds, embedded_chars):
+        """Savings so far; embedding time saved is extrapolated from the measured cost per character"""
+        per_char = embed_seconds / embedded_chars if embedded_chars else 0.0
+        return {
+            "chunks_seen": self.chunks_seen,
+            "chunks_dropped": self.chunks_dropped,
+            "lines_stripped": self.lines_stripped,
+            "chars_saved": self.chars_saved,
+            "seconds_saved": self.chars_saved * per_char,
+        }
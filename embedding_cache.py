@@ -0,0 +1,98 @@
+import os
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger('Langchain-Chatbot')
+
+
+def text_hash(text):
+    """Content address of a chunk of text"""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper backed by a persistent, content-addressed SQLite cache.
+
+    Document vectors are stored as float32 blobs keyed by (model name,
+    sha256 of the chunk text), so a chunk that was embedded once - by any
+    user, before any restart - is never sent to the embedding model again.
+    Only chunks missing from the cache reach ``underlying``. Query
+    embeddings are passed straight through.
+    """
+
+    def __init__(self, underlying: Embeddings, model_name: str, db_path: str, batch_size: int = 256):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, hash BLOB NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, hash)) WITHOUT ROWID"
+        )
+        self._db.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        """Embed ``texts`` as a float32 matrix, reusing cached vectors"""
+        hashes = [text_hash(t) for t in texts]
+        found = self._lookup(set(hashes))
+
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in found and h not in missing:
+                missing[h] = t
+        # Embed misses in batches, persisting each batch as soon as it is done
+        items = list(missing.items())
+        for i in range(0, len(items), self.batch_size):
+            batch = items[i:i + self.batch_size]
+            vectors = np.asarray(self.underlying.embed_documents([t for _, t in batch]), dtype=np.float32)
+            new_hashes = [h for h, _ in batch]
+            found.update(zip(new_hashes, vectors))
+            self._store(new_hashes, vectors)
+
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        logger.info(f"Embedding cache: {len(texts) - len(missing)} of {len(texts)} chunks reused, {len(missing)} embedded")
+        return np.vstack([found[h] for h in hashes])
+
+    def _lookup(self, hashes):
+        found = {}
+        hashes = list(hashes)
+        with self._lock:
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({','.join('?' * len(batch))})",
+                    [self.model_name, *batch]
+                ).fetchall()
+                found.update((h, np.frombuffer(v, dtype=np.float32)) for h, v in rows)
+        return found
+
+    def _store(self, hashes, vectors):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                [(self.model_name, h, v.astype(np.float32).tobytes()) for h, v in zip(hashes, vectors)]
+            )
+            self._db.commit()
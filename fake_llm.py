@@ -0,0 +1,148 @@
+import json
+import time
+import random
+import hashlib
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+LOREM = (
+    "offline answers are generated deterministically so every page can be load tested "
+    "without an api key or a local model server the same prompt always yields the same "
+    "tokens latency and failures which keeps benchmark runs comparable across commits"
+).split()
+
+
+class FakeLLMError(RuntimeError):
+    """Injected failure raised by FakeChatModel"""
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model for offline load testing.
+
+    Every decision (answer text, delays, injected failures) is derived from
+    ``seed`` and the prompt, so the same prompt always behaves the same way
+    regardless of call order or concurrency.
+
+    Args:
+        responses: scripted answers; one is picked per prompt. Without a
+            script a deterministic filler answer of ``response_words`` words
+            is generated.
+        tool_calls: scripted tool calls (``{"name": ..., "args": {...}}``)
+            made one per round when tools are bound, e.g. for the SQL agent.
+            Without a script one cheap tool (``sql_db_list_tables`` when
+            bound) is called once before answering.
+        tokens_per_second / time_to_first_token / jitter: simulated
+            streaming speed; ``jitter`` is a +/- fraction applied to each delay.
+        failure_rate: probability that a prompt raises FakeLLMError.
+        stop: default stop sequences, like ChatOpenAI/ChatOllama ``stop``.
+    """
+
+    model_name: str = "fake-chat"
+    temperature: float = 0.0
+    responses: List[str] = []
+    response_words: int = 60
+    tool_calls: List[Dict[str, Any]] = []
+    tokens_per_second: float = 50.0
+    time_to_first_token: float = 0.2
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+    seed: int = 0
+    stop: Optional[List[str]] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {
+            "model_name": self.model_name,
+            "temperature": self.temperature,
+            "seed": self.seed,
+            "responses": self.responses,
+            "stop": self.stop,
+        }
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    # ---- deterministic helpers ----
+    def _rng(self, messages: List[BaseMessage]) -> random.Random:
+        payload = json.dumps([(m.type, str(m.content)) for m in messages], sort_keys=True)
+        digest = hashlib.sha256(f"{self.seed}:{payload}".encode("utf-8")).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    def _answer(self, rng: random.Random) -> str:
+        if self.responses:
+            return self.responses[rng.randrange(len(self.responses))]
+        return " ".join(rng.choice(LOREM) for _ in range(self.response_words)).capitalize() + "."
+
+    def _next_tool_call(self, messages: List[BaseMessage], tools: List[Dict[str, Any]]):
+        rounds = sum(isinstance(m, ToolMessage) for m in messages)
+        script = self.tool_calls or [self._default_tool_call(tools)]
+        if rounds >= len(script):
+            return None
+        call = script[rounds]
+        return {"name": call["name"], "args": call.get("args", {}), "id": f"call_{rounds}"}
+
+    @staticmethod
+    def _default_tool_call(tools: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Call a cheap listing tool if bound (SQL agent), else the first tool, with empty required args"""
+        functions = [tool["function"] for tool in tools]
+        function = next((f for f in functions if f["name"] == "sql_db_list_tables"), functions[0])
+        required = function.get("parameters", {}).get("required", [])
+        return {"name": function["name"], "args": {name: "" for name in required}}
+
+    def _delay(self, rng: random.Random, seconds: float) -> None:
+        if self.jitter:
+            seconds *= 1 + rng.uniform(-self.jitter, self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    # ---- BaseChatModel API ----
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        rng = self._rng(messages)
+        if rng.random() < self.failure_rate:
+            raise FakeLLMError("Injected fake LLM failure")
+        self._delay(rng, self.time_to_first_token)
+
+        tools = kwargs.get("tools") or []
+        tool_call = self._next_tool_call(messages, tools) if tools else None
+        if tool_call:
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[{
+                "name": tool_call["name"], "args": json.dumps(tool_call["args"]),
+                "id": tool_call["id"], "index": 0,
+            }]))
+            if run_manager:
+                run_manager.on_llm_new_token("", chunk=chunk)
+            yield chunk
+            return
+
+        text = self._answer(rng)
+        for stop_sequence in stop or self.stop or []:
+            if stop_sequence in text:
+                text = text[:text.index(stop_sequence)]
+        per_token = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for i, word in enumerate(text.split(" ")):
+            if i:
+                self._delay(rng, per_token)
+            token = word if i == 0 else " " + word
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        content = ""
+        tool_calls = []
+        for chunk in self._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            content += chunk.message.content
+            tool_calls.extend(chunk.message.tool_calls)
+        message = AIMessage(content=content, tool_calls=tool_calls)
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,273 @@
+"""Local main-content extraction of HTML pages to markdown-ish text.
+
+A streaming ``html.parser`` walk: the page is fed to the parser chunk by
+chunk as it downloads, so at most ``max_bytes`` of a page are ever read
+and at most ``max_chars`` of text are kept.
+"""
+import re
+import codecs
+from collections import defaultdict
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+# Subtrees that never hold page content
+SKIP_TAGS = frozenset("script style noscript template svg canvas iframe object head form select button".split())
+# Page furniture around the content
+FURNITURE_TAGS = frozenset("nav header footer aside menu dialog".split())
+FURNITURE_HINTS = re.compile(r"nav|navbar|menu|sidebar|footer|breadcrumbs?|cookie|banner|share|social|related|comments?|advert\w*|ads?", re.I)
+# Share of the page's text above which a region with a furniture hint is taken to be the page
+# itself: hint words make up at least half of a "strong" hint ("sidebar", "cookie-banner"), only
+# part of a weak one ("layout has-sidebar", "social-feed-page")
+STRONG_HINT_SHARE = 0.5
+WEAK_HINT_SHARE = 0.15
+# Without any non-furniture text worth keeping (below this share) the whole page is used
+MIN_CONTENT_SHARE = 0.05
+# Hints on these say nothing about a region (e.g. <body class="has-sidebar">)
+NO_HINT_TAGS = frozenset(("html", "body", "main", "article"))
+MAIN_TAGS = frozenset(("main", "article"))
+BLOCK_TAGS = frozenset(
+    "p div section li ul ol dl dt dd h1 h2 h3 h4 h5 h6 pre blockquote table tr td th figure figcaption br hr main article".split()
+)
+VOID_TAGS = frozenset("area base br col embed hr img input link meta source track wbr".split())
+
+
+def hint_share(attrs):
+    """Page-text share below which an element's id/class/role marks it as furniture, or None"""
+    words = [word for value in (attrs.get("id"), attrs.get("class"), attrs.get("role")) if value
+             for word in re.split(r"[\s_-]+", value) if word]
+    hints = sum(1 for word in words if FURNITURE_HINTS.fullmatch(word))
+    if not hints:
+        return None
+    return STRONG_HINT_SHARE if 2 * hints >= len(words) else WEAK_HINT_SHARE
+
+
+class ContentExtractor(HTMLParser):
+    """Collects text blocks of a page, tagging those inside <main>/<article> or furniture"""
+
+    def __init__(self, max_chars=200_000):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.title = ""
+        self.base_href = None
+        self.links = []
+        self.blocks = []
+        self.chars = 0
+        self._stack = []
+        self._skip = 0
+        self._regions = []
+        self._region_share = []
+        self._main = 0
+        self._pre = 0
+        self._link = 0
+        self._in_title = False
+        self._block = None
+
+    @property
+    def full(self):
+        return self.chars >= self.max_chars
+
+    # ---- blocks ----
+    def _flush(self):
+        block, self._block = self._block, None
+        if block is None:
+            return
+        text = "".join(block["parts"])
+        text = text.strip("\n") if block["pre"] else " ".join(text.split())
+        if not text:
+            return
+        block["text"] = text
+        self.blocks.append(block)
+        self.chars += len(text)
+
+    def _open_block(self, prefix=""):
+        self._flush()
+        self._block = {"prefix": prefix, "parts": [], "link_chars": 0, "pre": self._pre > 0,
+                       "main": self._main > 0, "regions": tuple(self._regions)}
+
+    # ---- parser callbacks ----
+    def handle_starttag(self, tag, attrs):
+        if tag == "base" and self.base_href is None:
+            self.base_href = dict(attrs).get("href")
+        if tag in VOID_TAGS:
+            if tag == "br" and self._block is not None:
+                self._block["parts"].append("\n" if self._block["pre"] else " ")
+            return
+        if tag == "body":
+            # Close an unterminated <head>
+            self.handle_endtag("head")
+        attrs = dict(attrs)
+        if tag in SKIP_TAGS or attrs.get("hidden") is not None or attrs.get("aria-hidden") == "true":
+            self._skip += 1
+            self._stack.append((tag, "skip"))
+            return
+        # An article's own <header>/<footer> (title, byline) is content
+        if tag in FURNITURE_TAGS and not (self._main and tag in ("header", "footer")):
+            share = 1.0
+        else:
+            share = None if tag in NO_HINT_TAGS else hint_share(attrs)
+        self._stack.append((tag, share))
+        furniture = share is not None
+        if tag == "title":
+            self._in_title = True
+        if furniture or tag in MAIN_TAGS:
+            # Text after this point belongs to a different region of the page
+            self._flush()
+        if furniture:
+            # A possible furniture region; markdown() decides from the share of the text it holds
+            self._regions.append(len(self._region_share))
+            self._region_share.append(share)
+        if tag in MAIN_TAGS:
+            self._main += 1
+        if tag == "pre":
+            self._pre += 1
+        if tag == "a":
+            self._link += 1
+            if attrs.get("href"):
+                self.links.append(attrs["href"])
+        if tag in BLOCK_TAGS and not self._skip:
+            if tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+                self._open_block("#" * int(tag[1]) + " ")
+            elif tag == "li":
+                self._open_block("- ")
+            elif tag == "pre":
+                self._open_block("```\n")
+            elif tag == "blockquote":
+                self._open_block("> ")
+            else:
+                self._flush()
+
+    def handle_endtag(self, tag):
+        # Tolerate unclosed tags: pop up to the matching opener, if any
+        if not any(open_tag == tag for open_tag, _ in self._stack):
+            return
+        while self._stack:
+            open_tag, kind = self._stack.pop()
+            if kind == "skip":
+                self._skip -= 1
+            else:
+                if kind is not None:
+                    self._flush()
+                    self._regions.pop()
+                if open_tag in MAIN_TAGS:
+                    self._main -= 1
+                if open_tag == "pre":
+                    self._flush()
+                    self._pre -= 1
+                if open_tag == "a":
+                    self._link -= 1
+                if open_tag == "title":
+                    self._in_title = False
+                if open_tag in BLOCK_TAGS:
+                    self._flush()
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+            return
+        if self._skip or self.full:
+            return
+        if self._block is None:
+            self._open_block()
+        self._block["parts"].append(data)
+        if self._link:
+            self._block["link_chars"] += len(data.strip())
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    # ---- output ----
+    def markdown(self):
+        """Main content as markdown-ish text.
+
+        Furniture is semantic page furniture (<nav>, <footer>, ...) and
+        regions whose class/id hints at it, unless such a region holds so
+        much of the page's text that it must be a wrapper of the content.
+        Blocks inside <main>/<article> are used when they hold a good part of
+        the text; otherwise everything but furniture, or the whole page if
+        that leaves (almost) nothing. Short link lists (navigation that is
+        not marked up as such) are dropped either way.
+        """
+        total = sum(len(block["text"]) for block in self.blocks)
+        region_chars = defaultdict(int)
+        for block in self.blocks:
+            for region in block["regions"]:
+                region_chars[region] += len(block["text"])
+        furniture = {region for region, share in enumerate(self._region_share)
+                     if region_chars[region] < share * total}
+
+        body = [block for block in self.blocks if not furniture.intersection(block["regions"])]
+        if sum(len(block["text"]) for block in body) <= MIN_CONTENT_SHARE * total:
+            body = self.blocks
+        main = [block for block in body if block["main"]]
+        if sum(len(block["text"]) for block in main) >= 0.3 * sum(len(block["text"]) for block in body):
+            body = main
+        lines = []
+        for block in body:
+            text = block["text"]
+            if block["link_chars"] > 0.6 * len(text) and len(text) < 200:
+                continue
+            if block["pre"]:
+                lines.append(block["prefix"] + text + "\n```")
+            else:
+                lines.append(block["prefix"] + text)
+        title = " ".join(self.title.split())
+        text = "\n\n".join(lines)[:self.max_chars]
+        return f"# {title}\n\n{text}" if title and not text.startswith("# ") else text
+
+
+def extract(html, max_chars=200_000):
+    """Main content of an HTML string as markdown-ish text"""
+    parser = ContentExtractor(max_chars=max_chars)
+    parser.feed(html)
+    parser.close()
+    return parser.markdown()
+
+
+def read_page(response, max_bytes=2 << 20, max_chars=200_000, chunk_size=64 << 10):
+    """``(text, links)`` of a streamed ``requests`` response (``stream=True``).
+
+    HTML is parsed while it downloads and reading stops after ``max_bytes``
+    or once ``max_chars`` of text were collected; other text types are
+    returned as is, within the same caps, without links. Links are absolute.
+    """
+    content_type = response.headers.get("Content-Type", "text/html").split(";")[0].strip().lower()
+    is_html = content_type in ("text/html", "application/xhtml+xml")
+    if not is_html and not content_type.startswith("text/"):
+        raise ValueError(f"unsupported content type: {content_type}")
+
+    # Not response.encoding: requests assumes ISO-8859-1 for text/* without a charset
+    charset = re.search(r"charset=[\"']?([\w.:-]+)", response.headers.get("Content-Type", ""), re.I)
+    try:
+        decoder = codecs.getincrementaldecoder(charset.group(1) if charset else "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parser = ContentExtractor(max_chars=max_chars) if is_html else None
+    parts, size, received = [], 0, 0
+    for chunk in response.iter_content(chunk_size):
+        chunk = chunk[:max_bytes - received]
+        received += len(chunk)
+        text = decoder.decode(chunk)
+        if parser is not None:
+            parser.feed(text)
+            if parser.full:
+                break
+        else:
+            parts.append(text)
+            size += len(text)
+            if size >= max_chars:
+                break
+        if received >= max_bytes:
+            break
+    if parser is None:
+        return "".join(parts)[:max_chars], []
+    parser.close()
+    base = urljoin(response.url, parser.base_href) if parser.base_href else response.url
+    return parser.markdown(), [urljoin(base, href) for href in parser.links]
+
+
+def read_response(response, max_bytes=2 << 20, max_chars=200_000, chunk_size=64 << 10):
+    """Text of a streamed ``requests`` response; see ``read_page``"""
+    return read_page(response, max_bytes, max_chars, chunk_size)[0]
@@ -0,0 +1,182 @@
+import re
+from collections import defaultdict
+from typing import Any, Dict, List
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+# Identifiers such as INV-00042, E042 or v1.2.3 stay whole; their parts are indexed too
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were "
+    "will with what which who how when where why do does i you we they he she".split()
+)
+
+
+def tokenize(text):
+    """Lowercased terms of ``text``: words, whole identifiers and their parts"""
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token not in STOPWORDS:
+            terms.append(token)
+        if not token.isalnum():
+            terms.extend(part for part in re.split(r"[-_./]", token) if part and part not in STOPWORDS)
+    return terms
+
+
+class BM25Index:
+    """Incremental BM25 inverted index over documents keyed by id.
+
+    Postings are per-term arrays of document numbers and term frequencies,
+    so a lookup touches only the postings of the query terms and scores
+    them with vectorized NumPy. Postings are kept sorted by their BM25 term
+    score and at most ``max_postings`` are read per term: common words
+    (low idf) then cost the same as rare identifiers, which keeps lookups
+    sub-millisecond on large corpora. Deleted documents are masked out and
+    their postings dropped lazily when a term's arrays are rebuilt.
+    """
+
+    def __init__(self, k1=1.5, b=0.75, max_postings=1000):
+        self.k1 = k1
+        self.b = b
+        self.max_postings = max_postings
+        self._doc_ids = []
+        self._numbers = {}
+        self._lengths = np.zeros(1024, dtype=np.float32)
+        self._alive = np.zeros(1024, dtype=bool)
+        self._live_count = 0
+        self._deletions = 0
+        self._total_length = 0
+        self._pending = defaultdict(list)
+        self._postings = {}
+
+    def __len__(self):
+        return self._live_count
+
+    def add(self, ids, texts):
+        self.delete([doc_id for doc_id in ids if doc_id in self._numbers])
+        for doc_id, text in zip(ids, texts):
+            number = len(self._doc_ids)
+            if number == len(self._lengths):
+                self._lengths = np.concatenate([self._lengths, np.zeros_like(self._lengths)])
+                self._alive = np.concatenate([self._alive, np.zeros_like(self._alive)])
+            terms = tokenize(text)
+            counts = defaultdict(int)
+            for term in terms:
+                counts[term] += 1
+            for term, tf in counts.items():
+                self._pending[term].append((number, tf))
+            self._doc_ids.append(doc_id)
+            self._numbers[doc_id] = number
+            self._lengths[number] = len(terms)
+            self._alive[number] = True
+            self._live_count += 1
+            self._total_length += len(terms)
+
+    def delete(self, ids):
+        for doc_id in ids:
+            number = self._numbers.pop(doc_id, None)
+            if number is None:
+                continue
+            self._alive[number] = False
+            self._deletions += 1
+            self._live_count -= 1
+            self._total_length -= int(self._lengths[number])
+
+    def clear(self):
+        self.__init__(self.k1, self.b, self.max_postings)
+
+    def _term_scores(self, docs, tfs, avg_length):
+        norm = self.k1 * (1 - self.b + self.b * self._lengths[docs] / avg_length)
+        return tfs * (self.k1 + 1) / (tfs + norm)
+
+    def _term_postings(self, term):
+        """(doc numbers, term frequencies) arrays of the live postings of ``term``"""
+        docs, tfs, deletions = self._postings.get(term, (np.empty(0, np.int64), np.empty(0, np.float32), 0))
+        pending = self._pending.pop(term, None)
+        if not pending and deletions == self._deletions:
+            return docs, tfs
+        if pending:
+            new_docs, new_tfs = zip(*pending)
+            docs = np.concatenate([docs, np.asarray(new_docs, np.int64)])
+            tfs = np.concatenate([tfs, np.asarray(new_tfs, np.float32)])
+        alive = self._alive[docs]
+        if not alive.all():
+            docs, tfs = docs[alive], tfs[alive]
+        if len(docs) > self.max_postings:
+            # Best-scoring postings first, so lookups can stop early
+            order = np.argsort(-self._term_scores(docs, tfs, self._avg_length()), kind="stable")
+            docs, tfs = docs[order], tfs[order]
+        self._postings[term] = (docs, tfs, self._deletions)
+        return docs, tfs
+
+    def _avg_length(self):
+        return (self._total_length / self._live_count if self._live_count else 0.0) or 1.0
+
+    def search(self, query, k=10):
+        """Top ``k`` ``(id, score)`` pairs for ``query``, best first"""
+        if not self._live_count:
+            return []
+        n = self._live_count
+        avg_length = self._avg_length()
+        all_docs, all_scores = [], []
+        for term in set(tokenize(query)):
+            docs, tfs = self._term_postings(term)
+            if not len(docs):
+                continue
+            idf = np.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            docs, tfs = docs[:self.max_postings], tfs[:self.max_postings]
+            all_docs.append(docs)
+            all_scores.append(idf * self._term_scores(docs, tfs, avg_length))
+        if not all_docs:
+            return []
+        docs = np.concatenate(all_docs)
+        scores = np.concatenate(all_scores)
+        if len(all_docs) > 1:
+            docs, inverse = np.unique(docs, return_inverse=True)
+            scores = np.bincount(inverse, weights=scores)
+        k = min(k, len(docs))
+        best = np.argpartition(-scores, k - 1)[:k] if k < len(docs) else np.arange(len(docs))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self._doc_ids[docs[i]], float(scores[i])) for i in best]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuse ranked lists of ids; returns ids ordered by sum of 1 / (k + rank)"""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense + BM25 retriever over one NumpyVectorStore, fused with RRF.
+
+    The dense ranking comes from ``search_type`` ('similarity' or 'mmr')
+    with ``search_kwargs`` (e.g. ``nprobe``, ``lambda_mult``); the sparse
+    ranking from the store's keyword index. Both contribute ``fetch_k``
+    candidates and the best ``k`` fused documents are returned.
+    """
+
+    vectorstore: Any
+    search_type: str = "similarity"
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+    search_kwargs: Dict[str, Any] = {}
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        if self.search_type == "mmr":
+            dense = self.vectorstore.max_marginal_relevance_search(
+                query, k=self.fetch_k, fetch_k=2 * self.fetch_k, **self.search_kwargs)
+        else:
+            dense = self.vectorstore.similarity_search(query, k=self.fetch_k, **self.search_kwargs)
+        sparse = self.vectorstore.keyword_search(query, k=self.fetch_k)
+
+        docs = {doc.id: doc for doc in dense + sparse}
+        fused = reciprocal_rank_fusion([[d.id for d in dense], [d.id for d in sparse]], self.rrf_k)
+        return [docs[doc_id] for doc_id in fused[:self.k]]
@@ -0,0 +1,359 @@
+"""Document ingest helpers that run outside Streamlit.
+
+Everything here is importable without streamlit so it can execute in
+worker processes.
+"""
+import io
+import os
+import sys
+import time
+import queue
+import threading
+import types
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pypdf
+from langchain_core.documents import Document
+
+
+def open_pdf(data):
+    return pypdf.PdfReader(io.BytesIO(data))
+
+
+def extract_pages(data, start, stop, extraction_mode="plain"):
+    """Worker: text of pages ``start``..``stop - 1`` of the PDF in ``data``"""
+    reader = open_pdf(data)
+    return [reader.pages[i].extract_text(extraction_mode=extraction_mode) for i in range(start, stop)]
+
+
+def page_ranges(n_pages, workers, min_pages=4):
+    """Split ``n_pages`` into contiguous ranges, about two per worker.
+
+    Every task ships a copy of the file to its worker, so large files are
+    cut into few big ranges rather than one task per page.
+    """
+    n_tasks = max(1, min(-(-n_pages // min_pages), 2 * workers))
+    size = -(-n_pages // n_tasks)
+    return [(start, min(start + size, n_pages)) for start in range(0, n_pages, size)]
+
+
+_main_lock = threading.Lock()
+
+
+@contextmanager
+def detached_main():
+    """Hide the running script from worker start-up.
+
+    Streamlit installs the page script as ``__main__``, and spawned
+    workers would re-run it while bootstrapping. Pool processes are started
+    lazily on submit, so tasks are submitted inside this context.
+
+    ``sys.modules`` is process-wide. The lock keeps two ingests from
+    restoring each other's placeholder. Sessions' scripts do not take it,
+    but they do not need ``sys.modules["__main__"]`` either: Streamlit
+    assigns it afresh at the start of every run, and a page's code reaches
+    its own module through its globals. Only pickling an instance of a
+    class defined in a page script would fail during the swap, which lasts
+    as long as a few submits.
+    """
+    with _main_lock:
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            yield
+        finally:
+            sys.modules["__main__"] = main
+
+
+def open_pdfs(files):
+    """Open every ``(source, data)`` PDF; returns ``(readers, errors)`` keyed by index"""
+    readers, errors = {}, {}
+    for i, (source, data) in enumerate(files):
+        try:
+            readers[i] = open_pdf(data)
+        except Exception as e:
+            errors[i] = e
+    return readers, errors
+
+
+def iter_pdf_pages(files, readers, executor=None):
+    """Yield ``(i, docs, error)`` as page ranges of ``files[i]`` finish parsing.
+
+    ``docs`` are consecutive pages with PyPDFLoader-style ``source``/``page``
+    metadata; ranges of one file may arrive out of order when an executor
+    (a ParsePool) fans them out. A failed range yields its exception as
+    ``error`` instead. A range lost to a dead worker process is retried
+    once, as the worker may have died on another file's range.
+    """
+    def documents(i, start, texts):
+        return [Document(page_content=text, metadata={"source": files[i][0], "page": start + offset})
+                for offset, text in enumerate(texts)]
+
+    if executor is None:
+        for i, reader in readers.items():
+            for page_number, page in enumerate(reader.pages):
+                try:
+                    yield i, documents(i, page_number, [page.extract_text(extraction_mode="plain")]), None
+                except Exception as e:
+                    yield i, [], e
+                    break
+        return
+
+    workers = getattr(executor, "workers", None) or getattr(executor, "_max_workers", None) or default_parse_workers()
+    futures, retried = {}, set()
+    with detached_main():
+        for i, reader in readers.items():
+            for start, stop in page_ranges(len(reader.pages), workers):
+                futures[executor.submit(extract_pages, files[i][1], start, stop)] = (i, start, stop)
+    try:
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, start, stop = futures.pop(future)
+                try:
+                    texts = future.result()
+                except BrokenProcessPool as e:
+                    if (i, start) in retried:
+                        yield i, [], e
+                        continue
+                    retried.add((i, start))
+                    try:
+                        with detached_main():
+                            futures[executor.submit(extract_pages, files[i][1], start, stop)] = (i, start, stop)
+                    except Exception as e:
+                        yield i, [], e
+                    continue
+                except Exception as e:
+                    yield i, [], e
+                    continue
+                yield i, documents(i, start, texts), None
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+class IngestPipeline:
+    """Background parse -> split -> embed pipeline feeding a vector store.
+
+    Each stage runs in its own thread, connected by bounded queues so a
+    fast parser cannot pile up unembedded pages. Chunks are embedded and
+    inserted in batches of about ``batch_size``; a partial batch is flushed
+    whenever the embed stage would otherwise wait, so the first pages are
+    searchable long before the last ones are parsed.
+
+    Args:
+        files: list of ``(key, source, data)``; ``key`` identifies the file
+            in ``entries``.
+        vectordb: store with ``add_documents`` (e.g. NumpyVectorStore).
+        splitter: text splitter with ``split_documents``.
+        chunk_filter: optional dedupe.ChunkFilter applied per file before
+            embedding; see ``savings``.
+    """
+
+    _DONE = object()
+
+    def __init__(self, files, vectordb, splitter, executor=None, batch_size=64, queue_size=8, chunk_filter=None):
+        self.files = files
+        self.vectordb = vectordb
+        self.splitter = splitter
+        self.chunk_filter = chunk_filter
+        self.executor = executor
+        self.batch_size = batch_size
+        self.entries = {key: {"source": source, "ids": [], "docs": [], "pages": 0, "page_count": None,
+                              "error": None}
+                        for key, source, _ in files}
+        self.pages_total = 0
+        self.pages_indexed = 0
+        self.chunks_indexed = 0
+        self.embed_seconds = 0.0
+        self.embedded_chars = 0
+        self.error = None
+        self.first_batch = threading.Event()
+        self._cancelled = threading.Event()
+        self._pages = queue.Queue(maxsize=queue_size)
+        self._chunks = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._guard, args=(self._parse,), daemon=True),
+            threading.Thread(target=self._guard, args=(self._split,), daemon=True),
+            threading.Thread(target=self._guard, args=(self._embed,), daemon=True),
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    @property
+    def done(self):
+        return not any(thread.is_alive() for thread in self._threads)
+
+    def progress(self):
+        """``(pages_indexed, pages_total, chunks_indexed)`` so far"""
+        with self._lock:
+            return self.pages_indexed, self.pages_total, self.chunks_indexed
+
+    def savings(self):
+        """What the chunk filter kept from being embedded (see ChunkFilter.report), or None"""
+        if self.chunk_filter is None:
+            return None
+        with self._lock:
+            return self.chunk_filter.report(self.embed_seconds, self.embedded_chars)
+
+    # ---- stages ----
+    def _guard(self, stage):
+        try:
+            stage()
+        except Exception as e:
+            self.error = e
+            self.cancel()
+        finally:
+            if stage == self._embed:
+                self.first_batch.set()
+
+    def _put(self, q, item):
+        while not self._cancelled.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q, timeout=None):
+        while not self._cancelled.is_set():
+            try:
+                return q.get(timeout=timeout or 0.1)
+            except queue.Empty:
+                if timeout:
+                    raise
+        return self._DONE
+
+    def _parse(self):
+        keys = [key for key, _, _ in self.files]
+        files = [(source, data) for _, source, data in self.files]
+        readers, errors = open_pdfs(files)
+        for i, e in errors.items():
+            self.entries[keys[i]]["error"] = e
+        for i, reader in readers.items():
+            self.entries[keys[i]]["page_count"] = len(reader.pages)
+        with self._lock:
+            self.pages_total = sum(len(reader.pages) for reader in readers.values())
+        try:
+            for i, pages, error in iter_pdf_pages(files, readers, self.executor):
+                if error is not None:
+                    self.entries[keys[i]]["error"] = error
+                elif not self._put(self._pages, (keys[i], pages)):
+                    return
+        finally:
+            self._put(self._pages, self._DONE)
+
+    def _split(self):
+        try:
+            while (item := self._get(self._pages)) is not self._DONE:
+                key, pages = item
+                self.entries[key]["docs"].extend(pages)
+                if self.chunk_filter is None:
+                    splits = self.splitter.split_documents(pages)
+                else:
+                    splits = self.splitter.split_documents(self.chunk_filter.clean_pages(key, pages))
+                    splits = self.chunk_filter.filter_chunks(key, splits)
+                if not self._put(self._chunks, (key, len(pages), splits)):
+                    return
+        finally:
+            self._put(self._chunks, self._DONE)
+
+    def _embed(self):
+        pending = []
+
+        def flush():
+            splits = [split for _, _, chunk in pending for split in chunk]
+            start = time.perf_counter()
+            ids = self.vectordb.add_documents(splits) if splits else []
+            elapsed = time.perf_counter() - start
+            offset = 0
+            for key, pages, chunk in pending:
+                self.entries[key]["ids"].extend(ids[offset:offset + len(chunk)])
+                self.entries[key]["pages"] += pages
+                offset += len(chunk)
+            with self._lock:
+                self.pages_indexed += sum(pages for _, pages, _ in pending)
+                self.chunks_indexed += len(splits)
+                self.embed_seconds += elapsed
+                self.embedded_chars += sum(len(split.page_content) for split in splits)
+            pending.clear()
+            self.first_batch.set()
+
+        while True:
+            try:
+                item = self._get(self._chunks, timeout=0.05 if pending else None)
+            except queue.Empty:
+                # Nothing new right now: make what we have searchable
+                flush()
+                continue
+            if item is self._DONE:
+                break
+            pending.append(item)
+            if sum(len(chunk) for _, _, chunk in pending) >= self.batch_size:
+                flush()
+        if pending and not self._cancelled.is_set():
+            flush()
+
+
+def default_parse_workers():
+    """Worker processes for PDF parsing: PDF_PARSE_WORKERS or the CPU count"""
+    return int(os.environ.get("PDF_PARSE_WORKERS", 0)) or os.cpu_count() or 1
+
+
+class ParsePool:
+    """Process pool for PDF parsing that replaces itself when it breaks.
+
+    A worker that dies mid-task (the OOM killer, a crash on a bad upload)
+    leaves a ProcessPoolExecutor broken for good: every later submit raises
+    BrokenProcessPool. ``submit`` then shuts the broken pool down and
+    starts a fresh one, so one bad file does not disable parsing for
+    every session until restart.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._executor = self._create()
+
+    def _create(self):
+        import multiprocessing
+
+        # spawn: forking a multi-threaded Streamlit server is not safe; see detached_main
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, fn, *args):
+        with self._lock:
+            try:
+                return self._executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._create()
+                self.restarts += 1
+                return self._executor.submit(fn, *args)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            self._executor.shutdown(wait=wait)
+
+
+def create_parse_pool(workers=None):
+    """ParsePool for iter_pdf_pages, or None when parsing serially is cheaper"""
+    workers = workers or default_parse_workers()
+    if workers < 2:
+        return None
+    return ParsePool(workers)
@@ -0,0 +1,170 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+import requests
+
+from embedding_cache import text_hash
+from webfetch import DeadlineExceeded, host_of
+
+logger = logging.getLogger('Langchain-Chatbot')
+
+
+def read_text(response):
+    """Default reader: the whole decoded body"""
+    return response.text
+
+
+class PageCache:
+    """Persistent HTTP cache of fetched pages in front of a webfetch.Fetcher.
+
+    Bodies are stored in SQLite with their ``ETag`` / ``Last-Modified``
+    validators and a content hash, keyed by the requested URL. A page
+    younger than ``max_age`` is served without touching the network. An
+    older one is served as is while a conditional request revalidates it in
+    the background (stale-while-revalidate); past ``max_stale`` it is
+    revalidated before being served. A 304, or a 200 with the same body,
+    keeps the content hash unchanged, so callers keyed on it skip
+    re-splitting and re-embedding. Failures are remembered for
+    ``retry_after`` seconds instead of being retried on every rerun; a
+    page that only ran out of its batch's deadline is not a failure.
+
+    Responses are streamed; a ``reader`` turns one into the text that is
+    cached (e.g. html_extract.read_response), so only that text is stored.
+    """
+
+    def __init__(self, fetcher, db_path, max_age=3600.0, max_stale=86400.0, retry_after=300.0):
+        self.fetcher = fetcher
+        self.db_path = db_path
+        self.max_age = max_age
+        self.max_stale = max_stale
+        self.retry_after = retry_after
+        self._failures = {}
+        self._revalidating = set()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, body TEXT NOT NULL, hash TEXT NOT NULL, "
+            "etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    # ---- storage ----
+    def get(self, url):
+        """Cached entry of ``url`` as a dict, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, hash, etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("text", "hash", "etag", "last_modified", "fetched_at"), row))
+
+    def _store(self, url, text, headers):
+        entry = {
+            "text": text,
+            "hash": text_hash(text).hex(),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        }
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (url, body, hash, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, entry["text"], entry["hash"], entry["etag"], entry["last_modified"], entry["fetched_at"])
+            )
+            self._db.commit()
+        return entry
+
+    def _touch(self, url, entry):
+        entry = dict(entry, fetched_at=time.time())
+        with self._lock:
+            self._db.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (entry["fetched_at"], url))
+            self._db.commit()
+        return entry
+
+    # ---- fetching ----
+    def _fetch(self, url, entry, deadline=None, reader=None):
+        """Fetch ``url``, conditionally when ``entry`` has validators; returns the current entry"""
+        headers = {}
+        if entry is not None and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry is not None and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        response = self.fetcher.get(url, deadline, headers=headers, stream=True)
+        try:
+            if response.status_code == 304 and entry is not None:
+                return self._touch(url, entry)
+            text = (reader or read_text)(response)
+        finally:
+            response.close()
+        fetched = self._store(url, text, response.headers)
+        if entry is not None and fetched["hash"] != entry["hash"]:
+            logger.info(f"Page cache: {url} changed")
+        return fetched
+
+    def _revalidate(self, url, entry, reader):
+        try:
+            self._fetch(url, entry, reader=reader)
+        except Exception as e:
+            logger.info(f"Page cache: revalidating {url} failed, keeping the stale copy: {e}")
+        finally:
+            with self._lock:
+                self._revalidating.discard(url)
+
+    def _serve_cached(self, url, reader):
+        """Cached entry of ``url`` if it may be served without waiting, revalidating it when stale"""
+        entry = self.get(url)
+        if entry is None:
+            return None
+        age = time.time() - entry["fetched_at"]
+        if age < self.max_age:
+            return dict(entry, status="fresh")
+        if age >= self.max_stale:
+            return None
+        with self._lock:
+            start = url not in self._revalidating
+            self._revalidating.add(url)
+        if start:
+            self.fetcher.submit(self._revalidate, url, entry, reader, host=host_of(url))
+        return dict(entry, status="stale")
+
+    def _fetch_miss(self, url, deadline, reader):
+        failed_at, error = self._failures.get(url, (None, None))
+        if failed_at is not None and time.monotonic() - failed_at < self.retry_after:
+            raise error
+        entry = self.get(url)
+        try:
+            fetched = self._fetch(url, entry, deadline, reader)
+        except Exception as e:
+            # Running out of this batch's time says nothing about the page: retry it next time
+            out_of_time = isinstance(e, DeadlineExceeded) or (
+                isinstance(e, requests.Timeout) and deadline is not None and time.monotonic() >= deadline
+            )
+            if not out_of_time:
+                self._failures[url] = (time.monotonic(), e)
+            raise
+        self._failures.pop(url, None)
+        return dict(fetched, status="fetched" if entry is None else "revalidated")
+
+    def fetch_all(self, urls, deadline=None, reader=None):
+        """Yield ``(url, entry, error)`` for every url, servable cached pages first.
+
+        ``entry`` has the page ``text``, its content ``hash`` and the
+        ``status`` it was served with: 'fresh', 'stale' (revalidating in the
+        background), 'revalidated' or 'fetched'. See ``Fetcher.map`` for
+        the deadline.
+        """
+        misses = []
+        for url in urls:
+            entry = self._serve_cached(url, reader)
+            if entry is None:
+                misses.append(url)
+            else:
+                yield url, entry, None
+        yield from self.fetcher.map(lambda url: self._fetch_miss(url, deadline, reader), misses, deadline, host=host_of)
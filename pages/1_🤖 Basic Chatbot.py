@@ -167,7 +167,8 @@
 
 import utils
 import streamlit as st
-from streaming import StreamHandler
+import time
+from streaming import StreamHandler, ResponseCleaner
 
 utils.set_default_openai()
 
@@ -267,54 +268,30 @@ st.markdown("""
 st.markdown('<h1 class="main-header">💬 Basic Chatbot</h1>', unsafe_allow_html=True)
 st.markdown('<p class="sub-header">Simple Q&A without conversation memory</p>', unsafe_allow_html=True)
 
-def clean_llm_response(response):
-    """Clean up LLM response by removing conversation artifacts"""
-    if not response:
-        return response
-    
-    # Remove common conversation prefixes and hallucinated history
-    lines = response.split('\n')
-    cleaned_lines = []
-    
-    for line in lines:
-        line = line.strip()
-        
-        # Skip lines that are clearly conversation artifacts
-        if any(prefix in line for prefix in [
-            'Human:', 'AI:', 'AI response:', 'Artificial Intelligence:', 
-            'AI (Computer-Generated Voice):', 'AI-generated response:',
-            'The Human:', 'Human:', 'AI:'
-        ]):
-            continue
-            
-        # Clean lines that start with conversation markers but have content
-        if line.startswith('AI: '):
-            line = line[4:].strip()
-        elif line.startswith('Human: '):
-            line = line[7:].strip()
-        elif line.startswith('AI response: '):
-            line = line[13:].strip()
-        
-        # Only add non-empty lines
-        if line and not line.isspace():
-            cleaned_lines.append(line)
-    
-    # If we have cleaned content, return it
-    if cleaned_lines:
-        return '\n'.join(cleaned_lines)
-    
-    # If everything was filtered out, return original but cleaned
-    return response.replace('AI:', '').replace('Human:', '').replace('AI response:', '').strip()
-
 # ---------- Chatbot Class ----------
 class BasicChatbot:
 
     def __init__(self):
         utils.sync_st_session()
-        self.llm = utils.configure_llm()
+        self.llm = utils.configure_llm(generation_limits=True)
+        self.response_cache = utils.get_response_cache()
+        self.cache_namespace = utils.response_namespace(self.llm, "basic")
     
-    def get_llm_response(self, user_query):
-        """Get direct response from LLM without memory"""
+    def get_llm_response(self, user_query, stream_handler):
+        """Stream a direct response from the LLM without memory.
+
+        Tokens are cleaned as they arrive and pushed into ``stream_handler``;
+        time-to-first-token and total latency are recorded for the request.
+        Answers to repeated (or near-identical) questions come from the
+        response cache without calling the LLM.
+        """
+        start = time.perf_counter()
+        cached_response = self.response_cache.get(self.cache_namespace, user_query)
+        if cached_response is not None:
+            elapsed = time.perf_counter() - start
+            utils.record_latency(BasicChatbot, elapsed, elapsed)
+            return cached_response
+
         try:
             from langchain_core.messages import HumanMessage
             
@@ -325,20 +302,27 @@ Question: {user_query}
 
 Answer directly and clearly:"""
             
-            if hasattr(self.llm, 'invoke'):
-                response = self.llm.invoke([HumanMessage(content=prompt)])
-                raw_response = response.content
-            else:
-                raw_response = str(self.llm.invoke(prompt))
+            cleaner = ResponseCleaner()
+            ttft = None
+            # Identical questions in flight from other sessions share one upstream call
+            for token in utils.coalesced_stream(self.llm, [HumanMessage(content=prompt)]):
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                stream_handler.update(cleaner.feed(token))
             
-            # Clean the response
-            cleaned_response = clean_llm_response(raw_response)
+            # Clean the full response for the final render
+            cleaned_response = cleaner.finish()
+            total = time.perf_counter() - start
+            utils.record_latency(BasicChatbot, ttft, total)
+            if cleaned_response:
+                self.response_cache.put(self.cache_namespace, user_query, cleaned_response, latency=total)
             return cleaned_response
         except Exception as e:
             return f"Error generating response: {str(e)}"
     
     @utils.enable_chat_history
     def main(self):
+        utils.show_response_cache_stats()
         user_query = st.chat_input(placeholder="Ask me anything...")
         if user_query:
             utils.display_msg(user_query, 'user')
@@ -346,11 +330,12 @@ Answer directly and clearly:"""
                 # Use streaming for better UX
                 st_cb = StreamHandler(st.empty())
                 
-                # Get the cleaned response (no memory)
-                response = self.get_llm_response(user_query)
+                # Stream the cleaned response (no memory)
+                response = self.get_llm_response(user_query, st_cb)
                 
-                # Display the response
-                st.write(response)
+                # Final exact render of the response
+                st_cb.update(response)
+                st_cb.flush()
                 st.session_state.messages.append({"role": "assistant", "content": response})
                 utils.print_qa(BasicChatbot, user_query, response)
 
@@ -2,7 +2,6 @@ import utils
 import streamlit as st
 from streaming import StreamHandler
 from langchain.chains.conversation.base import ConversationChain
-from langchain.memory import ConversationBufferMemory
 
 utils.set_default_openai()
 
@@ -77,14 +76,15 @@ with st.container():
             utils.sync_st_session()
             self.llm = utils.configure_llm()
         
-        @st.cache_resource
-        def setup_chain(_self):
-            memory = ConversationBufferMemory()
-            chain = ConversationChain(llm=_self.llm, memory=memory, verbose=False)
+        def setup_chain(self):
+            # Per-session memory with a token budget (recent turns + rolling summary)
+            memory = utils.get_session_memory(self.llm)
+            chain = ConversationChain(llm=self.llm, memory=memory, verbose=False)
             return chain
         
         @utils.enable_chat_history
         def main(self):
+            utils.add_clear_button()
             chain = self.setup_chain()
             user_query = st.chat_input(placeholder="Ask me anything! I remember our conversation 💬")
             if user_query:
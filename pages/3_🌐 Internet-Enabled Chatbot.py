@@ -170,6 +170,7 @@
 
 
 
+import time
 import streamlit as st
 import utils
 from tavily import TavilyClient
@@ -187,6 +188,9 @@ if not config:
 
 llm, tavily_client = config
 
+# Search-grounded answers go stale quickly, so cached ones are only reused for an hour
+SEARCH_ANSWER_MAX_AGE = 3600
+
 # -------------------- Custom Styling --------------------
 st.markdown("""
     <style>
@@ -238,6 +242,8 @@ with st.container():
             utils.sync_st_session()
             self.llm = llm
             self.tavily_client = tavily_client
+            self.response_cache = utils.get_response_cache()
+            self.cache_namespace = utils.response_namespace(llm, "internet")
 
         def search_web(self, query):
             """Search the web using Tavily API"""
@@ -259,43 +265,37 @@ with st.container():
             assert self.llm is not None, "LLM is not initialized"
 
             try:
-                # Safe call
-                response = self.llm([HumanMessage(content=prompt)])
-                if isinstance(response, list) and len(response) > 0:
-                    first_msg = response[0]
-                    return getattr(first_msg, "content", str(first_msg))
-                return str(response)
+                # Identical prompts in flight from other sessions share one upstream call
+                return "".join(utils.coalesced_stream(self.llm, [HumanMessage(content=prompt)]))
             except Exception as e:
                 return f"Error generating response: {str(e)}"
 
 
 
-        @utils.enable_chat_history
-        def main(self):
-            user_query = st.chat_input("Ask me anything! 🌍")
-
-            if user_query:
-                utils.display_msg(user_query, 'user')
+        def answer_with_search(self, user_query):
+            """Search the web for the query and answer it from the results.
 
-                with st.chat_message("assistant"):
-                    search_results = self.search_web(user_query)
+            Returns ``(answer, searched)``; ``searched`` is False when no
+            results came back and the answer fell back to general knowledge.
+            """
+            search_results = self.search_web(user_query)
 
-                    if search_results:  # Check if we have results
-                        with st.expander("🔎 Web Search Results", expanded=False):
-                            for i, result in enumerate(search_results, 1):
-                                st.markdown(f"**{i}. {result.get('title', 'No Title')}**")
-                                st.markdown(f"{result.get('content', '')}")
-                                if result.get('url'):
-                                    st.markdown(f"*Source: {result.get('url')}*")
-                                st.divider()
+            if search_results:  # Check if we have results
+                with st.expander("🔎 Web Search Results", expanded=False):
+                    for i, result in enumerate(search_results, 1):
+                        st.markdown(f"**{i}. {result.get('title', 'No Title')}**")
+                        st.markdown(f"{result.get('content', '')}")
+                        if result.get('url'):
+                            st.markdown(f"*Source: {result.get('url')}*")
+                        st.divider()
 
-                        # Prepare context from search results
-                        context = "\n".join([
-                            f"- **{result.get('title', 'No Title')}**: {result.get('content', '')}"
-                            for result in search_results[:2]  # Use first 2 results for context
-                        ])
+                # Prepare context from search results
+                context = "\n".join([
+                    f"- **{result.get('title', 'No Title')}**: {result.get('content', '')}"
+                    for result in search_results[:2]  # Use first 2 results for context
+                ])
 
-                        enhanced_prompt = f"""Based on these recent web search results, answer the user's question clearly and accurately:
+                enhanced_prompt = f"""Based on these recent web search results, answer the user's question clearly and accurately:
 
 Search Results:
 {context}
@@ -303,14 +303,39 @@ Search Results:
 User Question: {user_query}
 
 Provide a comprehensive answer based on the search results:"""
-                    else:
-                        # No search results available
-                        enhanced_prompt = f"""Answer the following question: {user_query}
+            else:
+                # No search results available
+                enhanced_prompt = f"""Answer the following question: {user_query}
 
 Note: I couldn't access current web information, so I'll answer based on my general knowledge."""
 
-                    # Generate response from LLM
-                    final_response = self.ask_llm(enhanced_prompt)
+            # Generate response from LLM
+            return self.ask_llm(enhanced_prompt), bool(search_results)
+
+        @utils.enable_chat_history
+        def main(self):
+            utils.show_response_cache_stats()
+            user_query = st.chat_input("Ask me anything! 🌍")
+
+            if user_query:
+                utils.display_msg(user_query, 'user')
+
+                with st.chat_message("assistant"):
+                    start = time.perf_counter()
+                    final_response = self.response_cache.get(
+                        self.cache_namespace, user_query, max_age=SEARCH_ANSWER_MAX_AGE
+                    )
+                    if final_response is None:
+                        final_response, searched = self.answer_with_search(user_query)
+                        # Only answers grounded in search results are shared: a fallback
+                        # (no Tavily key, failed search) must not be served to other sessions
+                        if searched and not final_response.startswith("Error generating response"):
+                            self.response_cache.put(
+                                self.cache_namespace, user_query, final_response,
+                                latency=time.perf_counter() - start
+                            )
+                    else:
+                        st.caption("⚡ Answered from cache")
 
                     # Store and display response
                     st.session_state.messages.append({"role": "assistant", "content": final_response})
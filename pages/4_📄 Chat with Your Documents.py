@@ -1,13 +1,14 @@
 import os
 import re
-import tempfile
 import streamlit as st
 import utils
+import ingest
 from streaming import StreamHandler
+from vectorstore import NumpyVectorStore
+from hybrid import HybridRetriever
+from dedupe import ChunkFilter
 from langchain.memory.buffer import ConversationBufferMemory
 from langchain.chains import ConversationalRetrievalChain
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_community.vectorstores import DocArrayInMemorySearch
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 
@@ -34,12 +35,6 @@ class CustomDocChatbot:
             'portfolio': r'(?:portfolio|website)'
         }
 
-    def save_file(self, file):
-        """Save uploaded file to a temporary file and return path"""
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            tmp_file.write(file.getvalue())
-            return tmp_file.name
-
     def extract_links_from_text(self, text):
         """Extract URLs and platform mentions from text"""
         text = text.replace('\\n', ' ').replace('\\r', ' ')
@@ -72,41 +67,106 @@ class CustomDocChatbot:
         
         return unique_urls, unique_platforms
 
-    def setup_qa_chain(self, uploaded_files):
-        """Load PDFs and setup QA chain"""
-        docs = []
-        self.uploaded_files_content = []
-
-        for file in uploaded_files:
-            try:
-                file_path = self.save_file(file)
-                loader = PyPDFLoader(file_path)
-                loaded_docs = loader.load()
-                docs.extend(loaded_docs)
-
-                # Store text content
-                for d in loaded_docs:
-                    content = getattr(d, 'page_content', '') or ''
-                    self.uploaded_files_content.append(content)
-
-                # Clean up temp file
-                try:
-                    os.unlink(file_path)
-                except Exception:
-                    pass
-
-            except Exception as e:
-                st.error(f"Error loading {file.name}: {str(e)}")
+    def start_ingest(self, files, vectordb):
+        """Index ``{key: upload}`` in the background: parse -> split -> embed in batches"""
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000,
+            chunk_overlap=200,
+        )
+        st.session_state.doc_ingest = ingest.IngestPipeline(
+            [(key, file.name, file.getvalue()) for key, file in files.items()],
+            vectordb,
+            text_splitter,
+            executor=utils.get_parse_pool(),
+            chunk_filter=ChunkFilter()
+        ).start()
+
+    def finish_ingest(self):
+        """Move fully indexed files of the (finished or cancelled) ingest into the file index"""
+        pipeline = st.session_state.pop("doc_ingest")
+        pipeline.join()
+        if pipeline.error is not None:
+            st.error(f"Failed to index documents: {str(pipeline.error)}")
+
+        savings = pipeline.savings()
+        totals = st.session_state.setdefault("doc_savings", dict.fromkeys(savings, 0))
+        for name, value in savings.items():
+            totals[name] += value
+
+        for key, entry in pipeline.entries.items():
+            if entry["error"] is not None:
+                st.error(f"Error loading {entry['source']}: {str(entry['error'])}")
+            if entry["error"] is not None or entry["pages"] != entry["page_count"] or not entry["docs"]:
+                # Partially indexed: drop its chunks, it is re-added on the next sync
+                st.session_state.doc_vectordb.delete(entry["ids"])
                 continue
+            docs = sorted(entry["docs"], key=lambda d: d.metadata["page"])
+            urls, platforms = self.extract_all_links_from_pdfs(docs)
+            st.session_state.indexed_files[key] = {
+                "name": entry["source"],
+                "ids": entry["ids"],
+                "pages": len(docs),
+                "contents": [getattr(d, 'page_content', '') or '' for d in docs],
+                "urls": urls,
+                "platforms": platforms,
+            }
+
+    @st.fragment(run_every=1)
+    def show_ingest_progress(self):
+        """Live indicator of how much of the upload is searchable so far"""
+        pipeline = st.session_state.get("doc_ingest")
+        if pipeline is None:
+            return
+        if pipeline.done:
+            # Rerun the whole page to finish the ingest and show the content analysis
+            st.rerun()
+        pages, total, chunks = pipeline.progress()
+        st.progress(
+            pages / total if total else 0.0,
+            text=f"🔎 Searchable so far: {pages}/{total} pages ({chunks} chunks)"
+        )
 
-        if not docs:
-            st.error("No document content could be loaded.")
-            st.stop()
+    def sync_index(self, uploaded_files):
+        """Bring the vector index in line with the uploads, touching only changed files.
+
+        Returns True if any file was removed or started indexing.
+        """
+        if "doc_vectordb" not in st.session_state:
+            st.session_state.doc_vectordb = NumpyVectorStore(self.embedding_model, **utils.vector_store_options())
+            st.session_state.indexed_files = {}
+        if "doc_ingest" in st.session_state:
+            # Uploads changed mid-ingest: keep the files already complete, redo the rest
+            st.session_state.doc_ingest.cancel()
+            self.finish_ingest()
+        vectordb = st.session_state.doc_vectordb
+        indexed = st.session_state.indexed_files
+
+        # Files are identified by content, so renames and reordering are free
+        # and a re-uploaded file with new content is re-indexed
+        current = {}
+        for file in uploaded_files:
+            current.setdefault(utils.upload_digest(file), file)
+        removed = [key for key in indexed if key not in current]
+        added = [key for key in current if key not in indexed]
+
+        for key in removed:
+            vectordb.delete(indexed.pop(key)["ids"])
+        if added:
+            self.start_ingest({key: current[key] for key in added}, vectordb)
+
+        # Keep the file index in upload order, under the current file names
+        st.session_state.indexed_files = {key: indexed[key] for key in current if key in indexed}
+        for key, entry in st.session_state.indexed_files.items():
+            entry["name"] = current[key].name
+        return bool(removed or added)
+
+    def show_content_analysis(self):
+        """Aggregate per-file content and display findings in sidebar"""
+        entries = list(st.session_state.indexed_files.values())
+        self.uploaded_files_content = [content for entry in entries for content in entry["contents"]]
+        all_urls = list(dict.fromkeys(url for entry in entries for url in entry["urls"]))
+        all_platforms = list(dict.fromkeys(p for entry in entries for p in entry["platforms"]))
 
-        # Extract links and platform mentions
-        all_urls, all_platforms = self.extract_all_links_from_pdfs(docs)
-        
-        # Display findings in sidebar
         with st.sidebar.expander("🔍 Content Analysis", expanded=True):
             if all_urls:
                 st.subheader("🌐 URLs Found:")
@@ -115,7 +175,7 @@ class CustomDocChatbot:
                     st.write(f"• [{display_url}]({url})")
             else:
                 st.write("🌐 **No URLs found**")
-            
+
             if all_platforms:
                 st.subheader("📱 Platforms Mentioned:")
                 for platform in all_platforms:
@@ -123,40 +183,46 @@ class CustomDocChatbot:
             else:
                 st.write("📱 **No specific platforms mentioned**")
 
-        st.sidebar.success(f"✅ Loaded {len(docs)} pages from {len(uploaded_files)} PDF(s)")
+        pages = sum(entry["pages"] for entry in entries)
+        st.sidebar.success(f"✅ Loaded {pages} pages from {len(entries)} PDF(s)")
+        savings = st.session_state.get("doc_savings")
+        if savings and (savings["chunks_dropped"] or savings["lines_stripped"]):
+            st.sidebar.caption(
+                f"🧹 Skipped {savings['chunks_dropped']} duplicate chunk(s) and "
+                f"{savings['lines_stripped']} repeated header/footer line(s): "
+                f"~{savings['seconds_saved']:.1f}s of embedding saved"
+            )
 
-        # Continue with vector store setup
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-        )
-        splits = text_splitter.split_documents(docs)
-        vectordb = DocArrayInMemorySearch.from_documents(splits, self.embedding_model)
+        # Store content for special queries
+        st.session_state['uploaded_files_content'] = self.uploaded_files_content
+        st.session_state['found_urls'] = all_urls
+        st.session_state['found_platforms'] = all_platforms
 
-        retriever = vectordb.as_retriever(
+    def setup_qa_chain(self, vectordb):
+        """Setup QA chain over the shared index, reusing the session's chat memory"""
+        # Dense + BM25 keyword search fused, so exact identifiers are found too
+        retriever = HybridRetriever(
+            vectorstore=vectordb,
             search_type='similarity',
-            search_kwargs={'k': 3}
+            k=3,
+            fetch_k=10,
+            search_kwargs=utils.configure_vector_search()
         )
 
-        memory = ConversationBufferMemory(
-            memory_key='chat_history',
-            output_key='answer',
-            return_messages=True
-        )
+        if "doc_memory" not in st.session_state:
+            st.session_state.doc_memory = ConversationBufferMemory(
+                memory_key='chat_history',
+                output_key='answer',
+                return_messages=True
+            )
 
         qa_chain = ConversationalRetrievalChain.from_llm(
             llm=self.llm,
             retriever=retriever,
-            memory=memory,
+            memory=st.session_state.doc_memory,
             return_source_documents=True,
             verbose=False
         )
-        
-        # Store content for special queries
-        st.session_state['uploaded_files_content'] = self.uploaded_files_content
-        st.session_state['found_urls'] = all_urls
-        st.session_state['found_platforms'] = all_platforms
-        
         return qa_chain
 
     def handle_special_queries(self, user_query):
@@ -208,22 +274,37 @@ class CustomDocChatbot:
             size_kb = file.size // 1024
             st.sidebar.write(f"• {file.name} ({size_kb} KB)")
 
-        # Rebuild QA chain when files change
-        current_file_names = [f.name for f in uploaded_files]
-        needs_setup = (
-            "qa_chain" not in st.session_state or
-            "current_files" not in st.session_state or
-            st.session_state.current_files != current_file_names
-        )
+        # Index only the files that were added, drop the ones removed
+        changed = False
+        uploads_key = utils.uploads_digest(uploaded_files)
+        if st.session_state.get("indexed_uploads") != uploads_key:
+            try:
+                changed = self.sync_index(uploaded_files)
+                st.session_state.indexed_uploads = uploads_key
+            except Exception as e:
+                st.error(f"Failed to setup QA chain: {str(e)}")
+                st.stop()
+
+        # New files index in the background; chat unlocks after the first batch
+        pipeline = st.session_state.get("doc_ingest")
+        if pipeline is not None:
+            if not pipeline.first_batch.is_set():
+                with st.spinner("🔄 Analyzing document content..."):
+                    pipeline.first_batch.wait()
+            if pipeline.done:
+                self.finish_ingest()
+                changed = True
+            else:
+                with st.sidebar:
+                    self.show_ingest_progress()
 
-        if needs_setup:
-            with st.spinner("🔄 Analyzing document content..."):
-                try:
-                    st.session_state.qa_chain = self.setup_qa_chain(uploaded_files)
-                    st.session_state.current_files = current_file_names
-                except Exception as e:
-                    st.error(f"Failed to setup QA chain: {str(e)}")
-                    st.stop()
+        if not st.session_state.indexed_files and "doc_ingest" not in st.session_state:
+            st.error("No document content could be loaded.")
+            st.stop()
+        if changed and "doc_ingest" not in st.session_state:
+            self.show_content_analysis()
+
+        qa_chain = self.setup_qa_chain(st.session_state.doc_vectordb)
 
         user_query = st.chat_input(placeholder="💬 Ask something about your PDFs!")
 
@@ -242,7 +323,7 @@ class CustomDocChatbot:
 
                     # Use QA chain for other questions
                     st_cb = StreamHandler(st.empty())
-                    result = st.session_state.qa_chain.invoke(
+                    result = qa_chain.invoke(
                         {"question": user_query},
                         {"callbacks": [st_cb]}
                     )
@@ -1,22 +1,40 @@
 import os
+import time
+import functools
 import utils
-import requests
+import html_extract
+from crawler import Crawler, normalize_url, site_of
 import traceback
 import validators
 import streamlit as st
 from streaming import StreamHandler
+from vectorstore import NumpyVectorStore, embed_documents
+from hybrid import HybridRetriever
+from dedupe import ChunkFilter
 
 from langchain.memory import ConversationBufferMemory
 from langchain.chains import ConversationalRetrievalChain
 from langchain_core.documents.base import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import DocArrayInMemorySearch
 
 
 
 
 utils.set_default_openai()
 
+# Reader proxy that turns a URL into LLM-friendly text (overridable for offline benchmarks)
+READER_PROXY_URL = os.environ.get("READER_PROXY_URL", "https://r.jina.ai/")
+
+# Page text extraction: through the reader proxy, or locally from the page's HTML
+EXTRACTION_MODES = {"proxy": "Reader proxy (r.jina.ai)", "local": "Local (built-in)"}
+DEFAULT_EXTRACTION = os.environ.get("WEB_EXTRACTION", "proxy")
+# Caps on what local extraction reads from one page
+WEB_MAX_BYTES = int(os.environ.get("WEB_MAX_BYTES", 2 << 20))
+WEB_MAX_CHARS = int(os.environ.get("WEB_MAX_CHARS", 200_000))
+# Crawl mode politeness
+WEB_CRAWL_DELAY = float(os.environ.get("WEB_CRAWL_DELAY", 1.0))
+WEB_CRAWL_PER_HOST = int(os.environ.get("WEB_CRAWL_PER_HOST", 2))
+
 # --------------------------- #
 # 🌑 Streamlit Page Settings
 # --------------------------- #
@@ -141,6 +159,23 @@ st.markdown("<h1 class='main-title'>🔗 Chat with Website</h1>", unsafe_allow_h
 st.markdown("<p class='subtitle'>Ask anything about the contents of any website — all processed with real-time AI context understanding.</p>", unsafe_allow_html=True)
 
 
+def split_and_embed(url, text, embedding_model):
+    """Chunks of one page with their embeddings, minus near-duplicate chunks"""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    chunk_filter = ChunkFilter(boilerplate=False)
+    splits = chunk_filter.filter_chunks(url, splitter.split_documents([Document(page_content=text, metadata={"source": url})]))
+    texts = [split.page_content for split in splits]
+    start = time.perf_counter()
+    embeddings = embed_documents(embedding_model, texts) if texts else None
+    savings = chunk_filter.report(time.perf_counter() - start, sum(len(text) for text in texts))
+    return {
+        "texts": texts,
+        "metadatas": [split.metadata for split in splits],
+        "embeddings": embeddings,
+        "savings": savings,
+    }
+
+
 # --------------------------- #
 # 💬 Chatbot Class
 # --------------------------- #
@@ -151,33 +186,180 @@ class ChatbotWeb:
         self.llm = utils.configure_llm()
         self.embedding_model = utils.configure_embedding_model()
 
-    def scrape_website(self, url):
-        """Fetch website content via jina.ai proxy."""
-        try:
-            headers = {"User-Agent": "Mozilla/5.0"}
-            final_url = "https://r.jina.ai/" + url
-            res = requests.get(final_url, headers=headers, timeout=25)
-            res.raise_for_status()
-            return res.text
-        except Exception as e:
-            st.sidebar.error(f"⚠️ Failed to fetch: {url}\n\n{e}")
-            traceback.print_exc()
-            return ""
-
-    @st.cache_resource(show_spinner='🔍 Analyzing website...', ttl=3600)
-    def setup_vectordb(_self, websites):
-        """Scrape and store website text embeddings."""
-        docs = []
+    def scrape_websites(self, websites, mode="proxy"):
+        """Fetch website content, all URLs concurrently.
+
+        ``mode`` 'proxy' fetches through the jina.ai reader proxy; 'local'
+        fetches the page itself and extracts its main content here.
+        Pages come from the persistent page cache when possible. Returns
+        ``{url: entry}`` (``text``, content ``hash``) for the URLs that
+        arrived before the deadline.
+        """
+        cache = utils.get_page_cache()
+        deadline = time.monotonic() + utils.web_fetch_deadline()
+        if mode == "local":
+            requested = {url: url for url in websites}
+            reader = functools.partial(html_extract.read_response, max_bytes=WEB_MAX_BYTES, max_chars=WEB_MAX_CHARS)
+        else:
+            requested = {READER_PROXY_URL + url: url for url in websites}
+            reader = None
+        pages = {}
+        with st.spinner("🌐 Fetching websites..."):
+            for final_url, entry, error in cache.fetch_all(requested, deadline, reader):
+                url = requested[final_url]
+                if error is not None:
+                    st.sidebar.error(f"⚠️ Failed to fetch: {url}\n\n{error}")
+                    traceback.print_exception(error)
+                    continue
+                pages[url] = entry
+        return pages
+
+    @st.cache_resource(show_spinner='🔍 Analyzing website...', max_entries=256)
+    def build_segment(_self, url, content_hash, _text):
+        """Split and embed one page; cached by URL and content hash for all sessions.
+
+        Returns the segment's ``texts``, ``metadatas``, ``embeddings`` and
+        ``savings`` (near-duplicate chunks such as repeated navigation that
+        were not embedded).
+        """
+        return split_and_embed(url, _text, _self.embedding_model)
+
+    def setup_vectordb(self, websites, mode="proxy"):
+        """Bring the session's index in line with the websites' current content.
+
+        The index is composed of one segment per URL. Only URLs that were
+        added, removed or whose content hash changed touch the index;
+        unchanged pages (fresh, or revalidated as not modified) are neither
+        split nor embedded again. Failed or timed out URLs are skipped.
+        """
+        if "web_vectordb" not in st.session_state:
+            st.session_state.web_vectordb = NumpyVectorStore(self.embedding_model, **utils.vector_store_options())
+            st.session_state.web_segments = {}
+        vectordb = st.session_state.web_vectordb
+        segments = st.session_state.web_segments
+
+        pages = self.scrape_websites(websites, mode)
+        for url in [url for url in segments if url not in websites]:
+            vectordb.delete(segments.pop(url)["ids"])
         for url in websites:
-            docs.append(Document(page_content=_self.scrape_website(url), metadata={"source": url}))
-        
-        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        splits = splitter.split_documents(docs)
-        vectordb = DocArrayInMemorySearch.from_documents(splits, _self.embedding_model)
+            # A URL that failed this time keeps its previous segment
+            if url not in pages or segments.get(url, {}).get("hash") == pages[url]["hash"]:
+                continue
+            segment = self.build_segment(url, pages[url]["hash"], pages[url]["text"])
+            if url in segments:
+                vectordb.delete(segments[url]["ids"])
+            ids = vectordb.add_embeddings(segment["texts"], segment["embeddings"], segment["metadatas"]) \
+                if segment["texts"] else []
+            segments[url] = {"hash": pages[url]["hash"], "ids": ids, "savings": segment["savings"]}
         return vectordb
 
+    def configure_crawl(self):
+        """Sidebar crawl options; None when crawling is off"""
+        if not st.sidebar.toggle("🕸️ Crawl linked pages", key="web_crawl",
+                                 help="Also index pages of the same site linked from the added URLs "
+                                      "(extracted locally, robots.txt respected)"):
+            return None
+        return {
+            "max_depth": st.sidebar.slider("Crawl depth (links from the added URLs)", 1, 3, 1, key="web_crawl_depth"),
+            "max_pages": st.sidebar.slider("Max pages to crawl", 5, 200, 30, step=5, key="web_crawl_pages"),
+        }
+
+    def stop_crawl(self, seeds=None):
+        """Cancel the crawls of ``seeds`` (default: all of them) and drop the pages they indexed"""
+        state = st.session_state.get("web_crawl_state")
+        if state is None:
+            return
+        if seeds is None:
+            del st.session_state["web_crawl_state"]
+            seeds = list(state["crawls"])
+        crawlers = [state["crawls"].pop(seed) for seed in seeds]
+        for crawler in crawlers:
+            crawler.cancel()
+        for crawler in crawlers:
+            if crawler.started:
+                crawler.join()
+            for result in crawler.results.values():
+                st.session_state.web_vectordb.delete(result["ids"])
+
+    def sync_crawl(self, websites, options, vectordb):
+        """Crawl the links of each added website once.
+
+        Every website gets its own crawl, so adding one keeps the pages already
+        crawled from the others and removing one only drops its own pages.
+        Changing the crawl options starts over; turning crawling off stops it.
+        """
+        options_key = tuple(sorted(options.items())) if options else None
+        state = st.session_state.get("web_crawl_state")
+        if state is not None and state["options"] != options_key:
+            self.stop_crawl()
+            state = None
+        if options is None:
+            return
+        if state is None:
+            state = st.session_state.web_crawl_state = {"options": options_key, "crawls": {}}
+
+        seeds = {normalize_url(url): url for url in websites if normalize_url(url)}
+        self.stop_crawl([seed for seed in state["crawls"] if seed not in seeds])
+        crawls = state["crawls"]
+        embedding_model = self.embedding_model
+
+        def index_page(url, text, depth):
+            # Seeds are already indexed as their own segments; a page linked from two
+            # seeds of one site is kept by the crawl that reached it first
+            if url in crawls or any(url in crawler.results for crawler in list(crawls.values())):
+                return None
+            segment = split_and_embed(url, text, embedding_model)
+            ids = vectordb.add_embeddings(segment["texts"], segment["embeddings"], segment["metadatas"]) \
+                if segment["texts"] else []
+            return {"ids": ids, "savings": segment["savings"]}
+
+        for seed, url in seeds.items():
+            if seed not in crawls:
+                crawls[seed] = Crawler(
+                    utils.get_web_fetcher(), [url], index_page,
+                    per_host=WEB_CRAWL_PER_HOST, delay=WEB_CRAWL_DELAY,
+                    max_bytes=WEB_MAX_BYTES, max_chars=WEB_MAX_CHARS,
+                    **options
+                )
+        self.start_crawls(state)
+
+    @staticmethod
+    def start_crawls(state):
+        """Start waiting crawls, one per site at a time so the per-host politeness holds"""
+        busy = {site_of(seed) for seed, crawler in state["crawls"].items() if crawler.started and not crawler.done}
+        for seed, crawler in list(state["crawls"].items()):
+            if not crawler.started and site_of(seed) not in busy:
+                busy.add(site_of(seed))
+                crawler.start()
+
+    @staticmethod
+    def crawl_progress(state):
+        """``(finished, pages indexed, pages fetched, pages queued)`` over the session's crawls"""
+        crawlers = list(state["crawls"].values())
+        totals = [sum(counts) for counts in zip(*(crawler.progress() for crawler in crawlers))] or [0, 0, 0]
+        return all(crawler.started and crawler.done for crawler in crawlers), *totals
+
+    @st.fragment(run_every=1)
+    def show_crawl_progress(self):
+        """Live crawl status; crawled pages are searchable as soon as they are listed here"""
+        state = st.session_state.get("web_crawl_state")
+        if state is None:
+            return
+        self.start_crawls(state)
+        finished, indexed, fetched, queued = self.crawl_progress(state)
+        if finished:
+            # Rerun the whole page once to show the final status without polling
+            st.rerun()
+        st.caption(f"🕸️ Crawling... {indexed} page(s) indexed, {fetched} fetched, {queued} queued")
+
     def setup_qa_chain(self, vectordb):
-        retriever = vectordb.as_retriever(search_type='mmr', search_kwargs={'k': 2, 'fetch_k': 4})
+        retriever = HybridRetriever(
+            vectorstore=vectordb,
+            search_type='mmr',
+            k=2,
+            fetch_k=4,
+            search_kwargs=utils.configure_vector_search()
+        )
         memory = ConversationBufferMemory(memory_key='chat_history', output_key='answer', return_messages=True)
 
         return ConversationalRetrievalChain.from_llm(
@@ -194,6 +376,16 @@ class ChatbotWeb:
         # 🧭 Sidebar Inputs
         # --------------------------- #
         st.sidebar.markdown("## 🌍 Website Settings")
+        modes = list(EXTRACTION_MODES)
+        mode = st.sidebar.radio(
+            "Page extraction",
+            options=modes,
+            index=modes.index(DEFAULT_EXTRACTION) if DEFAULT_EXTRACTION in modes else 0,
+            format_func=EXTRACTION_MODES.get,
+            key="web_extraction_mode",
+            help="Local extraction fetches pages directly, skipping the proxy hop and its rate limit"
+        )
+        crawl_options = self.configure_crawl()
         if "websites" not in st.session_state:
             st.session_state["websites"] = []
 
@@ -210,8 +402,10 @@ class ChatbotWeb:
             if st.button("🧹 Clear All"):
                 st.session_state["websites"] = []
 
-        websites = list(set(st.session_state["websites"]))
+        # Ordered dedupe: a stable URL list across reruns
+        websites = list(dict.fromkeys(st.session_state["websites"]))
         if not websites:
+            self.stop_crawl()
             st.warning("Please add a website to start chatting.")
             st.stop()
         else:
@@ -219,7 +413,21 @@ class ChatbotWeb:
             for w in websites:
                 st.sidebar.write(f"- {w}")
 
-        vectordb = self.setup_vectordb(websites)
+        vectordb = self.setup_vectordb(websites, mode)
+        self.sync_crawl(websites, crawl_options, vectordb)
+        crawl = st.session_state.get("web_crawl_state")
+        if crawl is not None and crawl["crawls"]:
+            finished, indexed, fetched, _ = self.crawl_progress(crawl)
+            if finished:
+                st.sidebar.caption(f"🕸️ Crawl finished: {indexed} linked page(s) indexed ({fetched} fetched)")
+            else:
+                with st.sidebar:
+                    self.show_crawl_progress()
+        segments = st.session_state.web_segments.values()
+        dropped = sum(segment["savings"]["chunks_dropped"] for segment in segments)
+        if dropped:
+            seconds = sum(segment["savings"]["seconds_saved"] for segment in segments)
+            st.sidebar.caption(f"🧹 Skipped {dropped} duplicate chunk(s): ~{seconds:.1f}s of embedding saved")
         qa_chain = self.setup_qa_chain(vectordb)
 
         # --------------------------- #
@@ -1,11 +1,126 @@
+import time
 from langchain_core.callbacks import BaseCallbackHandler
 
 class StreamHandler(BaseCallbackHandler):
-    
-    def __init__(self, container, initial_text=""):
+    """Render streamed LLM tokens into a Streamlit container.
+
+    Tokens are buffered and the container is only re-rendered once
+    ``flush_interval`` seconds have passed or ``flush_chars`` characters
+    have piled up since the last render, whichever comes first. A final
+    flush on ``on_llm_end`` guarantees the container shows the exact text.
+    """
+
+    def __init__(self, container, initial_text="", flush_interval=0.05, flush_chars=64):
         self.container = container
         self.text = initial_text
+        self.flush_interval = flush_interval
+        self.flush_chars = flush_chars
+        self.render_count = 0
+        self._pending = 0
+        self._last_flush = time.monotonic()
 
     def on_llm_new_token(self, token: str, **kwargs):
-        self.text += token
-        self.container.markdown(self.text)
\ No newline at end of file
+        self.update(self.text + token)
+
+    def on_llm_end(self, response, **kwargs):
+        self.flush()
+
+    def update(self, text):
+        """Replace the buffered text, rendering it if the flush budget is spent"""
+        self._pending += abs(len(text) - len(self.text)) or int(text != self.text)
+        self.text = text
+        if (self._pending >= self.flush_chars or
+                time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Render buffered text immediately"""
+        if self._pending == 0 and self.render_count:
+            return
+        self.container.markdown(self.text)
+        self.render_count += 1
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+
+# -------------------- Response Cleanup --------------------
+TURN_MARKERS = [
+    'Human:', 'AI:', 'AI response:', 'Artificial Intelligence:',
+    'AI (Computer-Generated Voice):', 'AI-generated response:',
+    'The Human:'
+]
+
+def _clean_line(line):
+    """Return the cleaned line, or None if it is a conversation artifact"""
+    line = line.strip()
+
+    # Skip lines that are clearly conversation artifacts
+    if any(prefix in line for prefix in TURN_MARKERS):
+        return None
+
+    # Only keep non-empty lines
+    if line and not line.isspace():
+        return line
+    return None
+
+def _strip_markers(response):
+    return response.replace('AI:', '').replace('Human:', '').replace('AI response:', '').strip()
+
+def clean_llm_response(response):
+    """Clean up LLM response by removing conversation artifacts"""
+    if not response:
+        return response
+
+    # Remove common conversation prefixes and hallucinated history
+    cleaned_lines = [line for line in map(_clean_line, response.split('\n')) if line]
+
+    # If we have cleaned content, return it
+    if cleaned_lines:
+        return '\n'.join(cleaned_lines)
+
+    # If everything was filtered out, return original but cleaned
+    return _strip_markers(response)
+
+
+class ResponseCleaner:
+    """Apply clean_llm_response incrementally to a token stream.
+
+    Complete lines are cleaned as soon as their newline arrives. The line
+    still being generated is shown tentatively unless it could turn into a
+    turn marker, and is retracted if a marker shows up later in it.
+    ``finish()`` returns exactly what clean_llm_response would have
+    returned for the full text.
+    """
+
+    def __init__(self):
+        self.raw = ""
+        self._lines = []
+        self._partial = ""
+
+    def feed(self, token):
+        """Consume a token and return the text that is safe to display"""
+        self.raw += token
+        self._partial += token
+        *complete, self._partial = self._partial.split('\n')
+        for line in complete:
+            cleaned = _clean_line(line)
+            if cleaned:
+                self._lines.append(cleaned)
+        return self.preview
+
+    @property
+    def preview(self):
+        partial = self._partial.strip()
+        if partial and not any(m.startswith(partial) or m in partial for m in TURN_MARKERS):
+            return '\n'.join(self._lines + [partial])
+        return '\n'.join(self._lines)
+
+    def finish(self):
+        """Return the fully cleaned response"""
+        if not self.raw:
+            return self.raw
+        cleaned = _clean_line(self._partial)
+        lines = self._lines + [cleaned] if cleaned else self._lines
+        if lines:
+            return '\n'.join(lines)
+        return _strip_markers(self.raw)
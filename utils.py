@@ -1,17 +1,64 @@
 import os
+import re
+import json
+import time
 import openai
+import sqlite3
+import uuid
+import hashlib
+import threading
+import numpy as np
 import streamlit as st
+from collections import OrderedDict
 from datetime import datetime
 import logging
 from langchain_openai import ChatOpenAI
 from langchain_community.chat_models import ChatOllama
 from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
 from langchain_core.utils import convert_to_secret_str
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.messages import get_buffer_string
+from langchain.memory import ConversationSummaryBufferMemory
+from embedding_cache import CachedEmbeddings
+import ingest
+import dedupe
+import webfetch
+from page_cache import PageCache
 
 # Set up logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('Langchain-Chatbot')
 
+# On-disk caches (embeddings, ...) live here unless overridden per cache
+CACHE_DIR = os.environ.get("CHATBOT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+
+# Offline stand-in provider for load testing; only offered when ENABLE_FAKE_LLM is set
+FAKE_LLM_PROVIDER = "Fake (Offline Testing)"
+
+def env_flag(name):
+    """True if environment variable ``name`` is set to a truthy value"""
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+# Generation-time limits per provider. Stop sequences halt the model at the
+# first hallucinated conversation turn instead of paying for tokens that
+# clean_llm_response would strip afterwards. Bare "AI:" is only matched after
+# a newline because small models often open their answer with it.
+# OpenAI accepts at most 4 stop sequences.
+GENERATION_LIMITS = {
+    "openai": {
+        "stop": ["Human:", "\nAI:", "\nAI response:", "\nArtificial Intelligence:"],
+        "max_tokens": 1024,
+    },
+    "ollama": {
+        "stop": ["Human:", "\nAI:", "\nAI response:", "\nArtificial Intelligence:",
+                 "\nAI-generated response:", "\nAI (Computer-Generated Voice):"],
+        "num_predict": 512,
+    },
+    "fake": {
+        "stop": ["Human:", "\nAI:"],
+    },
+}
+
 def clear_llm_cache_on_provider_change():
     """Clear LLM cache when user switches between OpenAI and Ollama"""
     # Always initialize with OpenAI as default
@@ -34,7 +81,8 @@ def clear_llm_cache_on_provider_change():
                 if key in st.session_state:
                     del st.session_state[key]
         
-        # Clear model cache
+        # Clear this session's model cache. The pooled client itself stays:
+        # other sessions may share it, and idle/LRU eviction retires it
         if "configure_llm" in st.session_state:
             del st.session_state["configure_llm"]
         
@@ -93,15 +141,660 @@ def print_qa(cls, question, answer):
     """Print question and answer for logging purposes"""
     log_str = f"\nUsecase: {cls.__name__}\nQuestion: {question}\nAnswer: {answer}\n" + "------" * 10
     logger.info(log_str)
-    
+
+def record_latency(cls, ttft, total):
+    """Record time-to-first-token and total latency (seconds) of one request"""
+    entry = {"usecase": cls.__name__, "ttft": ttft, "total": total, "timestamp": datetime.now().isoformat()}
+    st.session_state.setdefault("latency_metrics", []).append(entry)
+    ttft_str = f"{ttft:.3f}s" if ttft is not None else "n/a"
+    logger.info(f"Latency [{cls.__name__}] ttft={ttft_str} total={total:.3f}s")
+
 @st.cache_resource
 def configure_embedding_model():
     """Configure and return the embedding model for vector storage"""
-    embedding_model = FastEmbedEmbeddings(model_name="BAAI/bge-small-en-v1.5")
-    return embedding_model
+    if env_flag("FAKE_EMBEDDINGS"):
+        # Offline load testing: deterministic vectors with the bge-small dimension
+        return DeterministicFakeEmbedding(size=384)
+    model_name = "BAAI/bge-small-en-v1.5"
+    embedding_model = FastEmbedEmbeddings(model_name=model_name)
+    # Chunks already embedded by any session (or before a restart) are read
+    # back from disk; only unseen chunks reach FastEmbed
+    db_path = os.environ.get("EMBEDDING_CACHE_DB", os.path.join(CACHE_DIR, "embeddings.sqlite"))
+    return CachedEmbeddings(embedding_model, model_name=model_name, db_path=db_path)
+
+def configure_vector_search():
+    """Sidebar choice between exact and approximate (IVF) vector search.
+
+    Returns retriever ``search_kwargs`` for NumpyVectorStore; ``nprobe=None``
+    means exact search.
+    """
+    mode = st.sidebar.radio(
+        "Vector search",
+        options=["Exact", "Approximate (IVF)"],
+        key="vector_search_mode",
+        help="Approximate search only scores the closest clusters of chunks; "
+             "much faster on large collections at a small cost in recall"
+    )
+    if mode == "Exact":
+        return {"nprobe": None}
+    nprobe = st.sidebar.slider(
+        "Clusters searched (nprobe)", min_value=1, max_value=64, value=8, key="ivf_nprobe",
+        help="Higher = better recall, slower search"
+    )
+    return {"nprobe": nprobe}
+
+def vector_store_options():
+    """NumpyVectorStore storage options from the environment.
+
+    VECTOR_QUANTIZATION selects in-RAM codes ('int8' or 'binary'; default
+    'none', plain float32). Codes only save memory when the full-precision
+    vectors used for rescoring are memory-mapped under VECTOR_MMAP_DIR;
+    otherwise they sit on the heap next to the codes and every search pays
+    the rescoring step for nothing.
+    """
+    quantization = os.environ.get("VECTOR_QUANTIZATION", "none").strip().lower()
+    if quantization in ("", "none", "off"):
+        return {}
+    mmap_dir = os.environ.get("VECTOR_MMAP_DIR") or None
+    if mmap_dir is None:
+        logger.warning(f"VECTOR_QUANTIZATION={quantization} without VECTOR_MMAP_DIR uses more memory than float32")
+    return {"quantization": quantization, "mmap_dir": mmap_dir}
+
+# -------------------- Upload Identity --------------------
+def file_digest(file, chunk_size=1 << 20):
+    """Streaming sha256 of a file-like object's bytes, leaving its position unchanged.
+
+    Usable as the cache key for anything derived from the file's content.
+    """
+    digest = hashlib.sha256()
+    position = file.tell()
+    file.seek(0)
+    for block in iter(lambda: file.read(chunk_size), b""):
+        digest.update(block)
+    file.seek(position)
+    return digest.hexdigest()
+
+def upload_digest(file):
+    """file_digest of a Streamlit upload, memoized per upload for this session"""
+    file_id = getattr(file, "file_id", None)
+    if file_id is None:
+        return file_digest(file)
+    digests = st.session_state.setdefault("upload_digests", {})
+    if file_id not in digests:
+        digests[file_id] = file_digest(file)
+    return digests[file_id]
+
+def uploads_digest(files):
+    """Order-insensitive identity of a set of uploads"""
+    return hashlib.sha256("".join(sorted(upload_digest(f) for f in files)).encode()).hexdigest()
+
+@st.cache_resource
+def get_parse_pool():
+    """Process pool shared by all sessions for PDF parsing (None on single-CPU hosts); replaces itself if a worker dies"""
+    return ingest.create_parse_pool()
+
+# -------------------- Web Fetching --------------------
+@st.cache_resource
+def get_web_fetcher():
+    """Thread pool + keep-alive HTTP session shared by all sessions for website scraping"""
+    return webfetch.Fetcher(
+        max_workers=int(os.environ.get("WEB_FETCH_WORKERS", 8)),
+        per_host=int(os.environ.get("WEB_FETCH_PER_HOST", 4)),
+    )
+
+@st.cache_resource
+def get_page_cache():
+    """Persistent HTTP cache of scraped pages, shared by all sessions"""
+    return PageCache(
+        get_web_fetcher(),
+        db_path=os.environ.get("WEB_CACHE_DB", os.path.join(CACHE_DIR, "pages.sqlite")),
+        max_age=float(os.environ.get("WEB_CACHE_MAX_AGE", 3600)),
+        max_stale=float(os.environ.get("WEB_CACHE_MAX_STALE", 86400)),
+    )
+
+def web_fetch_deadline():
+    """Overall time budget (seconds) for scraping a batch of websites"""
+    return float(os.environ.get("WEB_FETCH_DEADLINE", 60))
+
+# -------------------- LLM Client Registry --------------------
+def hash_secret(secret):
+    """Return a short, non-reversible fingerprint of an API key for use in cache keys"""
+    if not secret:
+        return None
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:16]
+
+def llm_client_key(provider, model, temperature, endpoint=None, api_key=None, **options):
+    """Build the registry key identifying one LLM client configuration"""
+    # Nested values (e.g. scripted tool calls: lists of dicts) are frozen to JSON
+    frozen_options = tuple(sorted(
+        (name, json.dumps(value, sort_keys=True, default=repr) if isinstance(value, (list, dict)) else value)
+        for name, value in options.items()
+    ))
+    return (provider, model, temperature, endpoint, hash_secret(api_key), frozen_options)
+
+
+class IdleLRURegistry:
+    """Thread-safe keyed registry of long-lived objects.
+
+    Objects idle for longer than ``max_idle_seconds`` are dropped, and the
+    least recently used one goes once ``max_entries`` is exceeded.
+    """
+
+    def __init__(self, max_entries=32, max_idle_seconds=1800):
+        self.max_entries = max_entries
+        self.max_idle_seconds = max_idle_seconds
+        self._items = OrderedDict()  # key -> (item, last_used)
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key, factory):
+        """Return the object for ``key``, building it with ``factory()`` if needed"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            if key in self._items:
+                item, _ = self._items.pop(key)
+                self._items[key] = (item, now)
+                return item
+
+        # Build outside the lock; a racing duplicate simply loses
+        item = factory()
+        with self._lock:
+            if key in self._items:
+                item, _ = self._items.pop(key)
+            self._items[key] = (item, now)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return item
+
+    def evict(self, key):
+        """Drop one object from the registry"""
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+    def _evict_idle(self, now):
+        for key in [k for k, (_, used) in self._items.items() if now - used > self.max_idle_seconds]:
+            del self._items[key]
+
+
+class LLMClientRegistry(IdleLRURegistry):
+    """Process-wide LRU registry of chat model clients.
+
+    Streamlit reruns the page script on every widget interaction. Handing back
+    the same client for an identical configuration keeps its HTTP connection
+    pool (and TLS sessions) warm across reruns and across user sessions.
+    """
+
+
+@st.cache_resource
+def get_llm_registry():
+    """Shared LLM client registry for the whole Streamlit server process"""
+    return LLMClientRegistry()
+
+def get_or_create_llm(provider, model, temperature, factory, endpoint=None, api_key=None, **options):
+    """Fetch a pooled LLM client for this configuration, remembering it for the session"""
+    key = llm_client_key(provider, model, temperature, endpoint, api_key, **options)
+    st.session_state["configure_llm"] = key
+    return get_llm_registry().get_or_create(key, factory)
+
+# -------------------- Conversation Memory Store --------------------
+def approx_token_count(text):
+    """Cheap token estimate (~4 characters per token) that needs no tokenizer"""
+    return (len(text) + 3) // 4
+
+# Whitespace after a sentence (not after "e.g." mid-sentence), or a line break
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])|\n+")
+
+def last_sentences(text, max_chars):
+    """The end of ``text`` cut to ``max_chars`` at a sentence boundary (a word boundary if none fits)"""
+    if len(text) <= max_chars:
+        return text
+    cut = len(text) - max_chars
+    for match in SENTENCE_END.finditer(text):
+        if match.end() >= cut:
+            if match.end() < len(text):
+                return text[match.end():]
+            break
+    tail = text[cut:]
+    return tail if text[cut - 1].isspace() else tail.partition(" ")[2].lstrip()
+
+
+class BoundedConversationMemory(ConversationSummaryBufferMemory):
+    """Conversation memory with a hard token budget.
+
+    Recent turns are kept verbatim while they fit in ``max_token_limit``;
+    older turns are folded into a rolling LLM-written summary, itself capped
+    at ``max_summary_tokens`` by dropping its oldest whole sentences. Tokens are estimated with approx_token_count
+    so pruning works for any provider without a local tokenizer.
+    """
+
+    max_token_limit: int = 768
+    max_summary_tokens: int = 256
+
+    def prune(self) -> None:
+        """Move the oldest turns into the summary until the window fits the budget"""
+        buffer = self.chat_memory.messages
+        if self._window_tokens(buffer) <= self.max_token_limit:
+            return
+        pruned_memory = []
+        while buffer and self._window_tokens(buffer) > self.max_token_limit:
+            pruned_memory.append(buffer.pop(0))
+        summary = self.predict_new_summary(pruned_memory, self.moving_summary_buffer)
+        self.moving_summary_buffer = last_sentences(summary, self.max_summary_tokens * 4)
+
+    def _window_tokens(self, messages):
+        return approx_token_count(get_buffer_string(messages, human_prefix=self.human_prefix, ai_prefix=self.ai_prefix))
+
+
+class SessionMemoryStore(IdleLRURegistry):
+    """Process-wide store of per-session conversation memories.
+
+    Each browser session gets its own memory instead of one shared by every
+    user of the server. Idle sessions are evicted (LRU) so memory use stays
+    flat no matter how many users come and go.
+    """
+
+    def evict_session(self, session_id):
+        """Drop every memory of one session, whatever its namespace"""
+        with self._lock:
+            for key in [key for key in self._items if key[1] == session_id]:
+                del self._items[key]
+
+
+@st.cache_resource
+def get_session_memory_store():
+    """Shared per-session memory store for the whole Streamlit server process"""
+    return SessionMemoryStore(max_entries=500, max_idle_seconds=3600)
+
+def get_session_id():
+    """Stable identifier of the current browser session"""
+    if "session_id" not in st.session_state:
+        st.session_state["session_id"] = uuid.uuid4().hex
+    return st.session_state["session_id"]
+
+def get_session_memory(llm, namespace="context", max_token_limit=768):
+    """Return this session's bounded conversation memory, summarizing with ``llm``"""
+    memory = get_session_memory_store().get_or_create(
+        (namespace, get_session_id()),
+        lambda: BoundedConversationMemory(llm=llm, max_token_limit=max_token_limit)
+    )
+    # Follow provider/model switches for future summaries
+    memory.llm = llm
+    return memory
+
+# -------------------- Credential Health Probes --------------------
+class HealthProbeCache:
+    """TTL cache for credential and endpoint health probes.
+
+    A result younger than ``ttl`` seconds is served without touching the
+    network. An older successful result is still served, while a background
+    thread revalidates it, so a rerun never blocks on a probe once a key has
+    been validated. Failures are only cached for ``failure_ttl`` seconds and
+    are re-probed synchronously after that.
+    """
+
+    def __init__(self, ttl=600, failure_ttl=30):
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self._results = {}  # key -> [ok, error, checked_at]
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def check(self, key, probe):
+        """Return ``(ok, error)`` for ``key``, calling ``probe()`` only when due"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._results.get(key)
+            if cached:
+                ok, error, checked_at = cached
+                age = now - checked_at
+                if age < (self.ttl if ok else self.failure_ttl):
+                    return ok, error
+                if ok:
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key, probe), daemon=True).start()
+                    return ok, error
+        return self._run(key, probe)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._results.pop(key, None)
+
+    def _run(self, key, probe):
+        try:
+            probe()
+            result = (True, None)
+        except Exception as e:
+            result = (False, str(e))
+        with self._lock:
+            self._results[key] = [result[0], result[1], time.monotonic()]
+        return result
+
+    def _refresh(self, key, probe):
+        try:
+            self._run(key, probe)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+
+@st.cache_resource
+def get_health_probe_cache():
+    """Shared health probe cache; TTL is configurable via HEALTH_PROBE_TTL (seconds)"""
+    return HealthProbeCache(ttl=float(os.environ.get("HEALTH_PROBE_TTL", 600)))
+
+def check_openai_credentials(api_key, base_url=None):
+    """Validate an OpenAI key against the cheap models metadata endpoint, cached per hashed key"""
+    def probe():
+        client = openai.OpenAI(api_key=api_key, base_url=base_url, max_retries=0, timeout=15)
+        client.models.list()
+    return get_health_probe_cache().check(("openai", base_url, hash_secret(api_key)), probe)
+
+# -------------------- Response Cache --------------------
+def normalize_prompt(prompt):
+    """Normalize a user prompt for exact-match caching (case, whitespace, trailing punctuation)"""
+    return re.sub(r"\s+", " ", prompt).strip().rstrip("?!. ").lower()
+
+def response_namespace(llm, usecase):
+    """Cache namespace for answers produced by ``llm`` on one page"""
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None)
+    return f"{usecase}:{type(llm).__name__}:{model}:{getattr(llm, 'temperature', None)}"
+
 
-def configure_openai_llm():
-    """Configure OpenAI LLM with persistent connection inside sidebar."""
+class ResponseCache:
+    """Cache of LLM answers to history-independent questions.
+
+    Lookups first try the normalized prompt verbatim, then fall back to the
+    most similar cached prompt in the same namespace (cosine similarity of
+    ``embed_fn`` vectors at or above ``similarity_threshold``) that mentions
+    the same numbers and identifiers, since embeddings barely tell
+    "convert 15 USD" from "convert 50 USD". Each namespace
+    keeps at most ``max_entries`` answers (LRU) for at most ``ttl`` seconds.
+    With ``db_path`` entries are also persisted to SQLite and reloaded on
+    startup. Hit/miss counters and the generation time saved by hits are
+    available from ``stats()``.
+    """
+
+    def __init__(self, embed_fn=None, similarity_threshold=0.92, max_entries=512, ttl=24 * 3600, db_path=None):
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = {}   # namespace -> OrderedDict(normalized prompt -> entry dict)
+        self._matrices = {}  # namespace -> (keys, normalized embedding matrix, identifiers of each key)
+        self._vectors = OrderedDict()  # recently embedded prompts
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "saved_seconds": 0.0}
+        self._lock = threading.RLock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "namespace TEXT, prompt TEXT, answer TEXT, embedding BLOB, created REAL, latency REAL, "
+                "PRIMARY KEY (namespace, prompt))"
+            )
+            self._load()
+
+    def get(self, namespace, prompt, max_age=None):
+        """Return the cached answer for ``prompt`` or None"""
+        key = normalize_prompt(prompt)
+        max_age = self.ttl if max_age is None else min(max_age, self.ttl)
+        with self._lock:
+            entries = self._entries.get(namespace, OrderedDict())
+            self._expire(namespace, entries)
+            entry = entries.get(key)
+            if entry and time.time() - entry["created"] <= max_age:
+                return self._hit(namespace, key, entry, "exact_hits")
+
+        vector = self._embed(key)
+        with self._lock:
+            if vector is not None and namespace in self._entries:
+                keys, matrix, idents = self._matrix(namespace)
+                if len(keys):
+                    scores = matrix @ vector
+                    wanted = dedupe.identifiers(key)
+                    for best in np.argsort(-scores):
+                        if scores[best] < self.similarity_threshold:
+                            break
+                        entry = self._entries[namespace].get(keys[best])
+                        if idents[best] == wanted and entry and time.time() - entry["created"] <= max_age:
+                            return self._hit(namespace, keys[best], entry, "semantic_hits")
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, namespace, prompt, answer, latency=0.0):
+        """Store ``answer`` for ``prompt``; ``latency`` is what a future hit saves"""
+        key = normalize_prompt(prompt)
+        vector = self._embed(key)
+        entry = {"answer": answer, "vector": vector, "created": time.time(), "latency": latency or 0.0}
+        with self._lock:
+            entries = self._entries.setdefault(namespace, OrderedDict())
+            entries.pop(key, None)
+            entries[key] = entry
+            self._matrices.pop(namespace, None)
+            while len(entries) > self.max_entries:
+                old_key, _ = entries.popitem(last=False)
+                self._delete(namespace, old_key)
+            if self._db:
+                blob = vector.astype(np.float32).tobytes() if vector is not None else None
+                self._db.execute(
+                    "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?, ?)",
+                    (namespace, key, answer, blob, entry["created"], entry["latency"])
+                )
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = sum(len(e) for e in self._entries.values())
+        lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        stats["hit_rate"] = (lookups - stats["misses"]) / lookups if lookups else 0.0
+        return stats
+
+    def _hit(self, namespace, key, entry, counter):
+        self._entries[namespace].move_to_end(key)
+        self._stats[counter] += 1
+        self._stats["saved_seconds"] += entry["latency"]
+        return entry["answer"]
+
+    def _embed(self, text):
+        if self.embed_fn is None:
+            return None
+        with self._lock:
+            if text in self._vectors:
+                self._vectors.move_to_end(text)
+                return self._vectors[text]
+        try:
+            vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Response cache embedding failed, using exact matches only: {e}")
+            return None
+        vector /= np.linalg.norm(vector) or 1.0
+        with self._lock:
+            self._vectors[text] = vector
+            while len(self._vectors) > 64:
+                self._vectors.popitem(last=False)
+        return vector
+
+    def _matrix(self, namespace):
+        if namespace not in self._matrices:
+            items = [(k, e["vector"]) for k, e in self._entries[namespace].items() if e["vector"] is not None]
+            keys = [k for k, _ in items]
+            matrix = np.vstack([v for _, v in items]) if items else np.empty((0, 0), dtype=np.float32)
+            self._matrices[namespace] = (keys, matrix, [dedupe.identifiers(k) for k in keys])
+        return self._matrices[namespace]
+
+    def _expire(self, namespace, entries):
+        cutoff = time.time() - self.ttl
+        for key in [k for k, e in entries.items() if e["created"] < cutoff]:
+            del entries[key]
+            self._delete(namespace, key)
+
+    def _delete(self, namespace, key):
+        self._matrices.pop(namespace, None)
+        if self._db:
+            self._db.execute("DELETE FROM response_cache WHERE namespace = ? AND prompt = ?", (namespace, key))
+            self._db.commit()
+
+    def _load(self):
+        rows = self._db.execute(
+            "SELECT namespace, prompt, answer, embedding, created, latency FROM response_cache "
+            "WHERE created >= ? ORDER BY created", (time.time() - self.ttl,)
+        ).fetchall()
+        for namespace, key, answer, blob, created, latency in rows:
+            vector = np.frombuffer(blob, dtype=np.float32) if blob else None
+            self._entries.setdefault(namespace, OrderedDict())[key] = {
+                "answer": answer, "vector": vector, "created": created, "latency": latency
+            }
+
+
+@st.cache_resource
+def get_response_cache():
+    """Shared response cache; set RESPONSE_CACHE_DB to a file path to persist it"""
+    return ResponseCache(
+        embed_fn=lambda text: configure_embedding_model().embed_query(text),
+        similarity_threshold=float(os.environ.get("RESPONSE_CACHE_THRESHOLD", 0.92)),
+        db_path=os.environ.get("RESPONSE_CACHE_DB") or None,
+    )
+
+def show_response_cache_stats():
+    """Show response cache counters in the sidebar"""
+    stats = get_response_cache().stats()
+    hits = stats["exact_hits"] + stats["semantic_hits"]
+    st.sidebar.caption(
+        f"⚡ Response cache: {hits} hits ({stats['semantic_hits']} semantic) / {stats['misses']} misses · "
+        f"~{stats['saved_seconds']:.1f}s of generation saved"
+    )
+
+# -------------------- Request Coalescing --------------------
+class _Flight:
+    """One in-flight upstream call and the tokens it has produced so far"""
+
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self.readers = 0
+        self.cond = threading.Condition()
+
+
+class SingleFlight:
+    """Share one upstream LLM call between identical concurrent requests.
+
+    The first caller for a key starts the producer on its own thread; every
+    caller, the first included, replays the tokens as they are produced, so
+    each can stream them into its own StreamHandler. A caller that stops
+    reading early (rerun, stop, closed generator) just leaves: the call
+    keeps going for the others and is only cut short once nobody is
+    reading. Once the call finishes the key is released, and later requests
+    start a fresh call (repeat questions are the response cache's job).
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+
+    def stream(self, key, producer):
+        """Return an iterator of tokens for ``key``, calling ``producer()`` only if no call is in flight"""
+        with self._lock:
+            flight = self._flights.get(key)
+            lead = flight is None
+            if lead:
+                flight = self._flights[key] = _Flight()
+                self.upstream_calls += 1
+            else:
+                self.coalesced_calls += 1
+            flight.readers += 1
+        if lead:
+            threading.Thread(target=self._pump, args=(key, flight, producer),
+                             name="single-flight", daemon=True).start()
+        return self._follow(flight)
+
+    def _pump(self, key, flight, producer):
+        tokens = None
+        try:
+            tokens = producer()
+            for token in tokens:
+                with flight.cond:
+                    flight.tokens.append(token)
+                    flight.cond.notify_all()
+                with self._lock:
+                    if flight.readers == 0:
+                        # Every caller left; release the key so a new request starts afresh
+                        self._flights.pop(key, None)
+                        break
+        except Exception as e:
+            flight.error = e
+        finally:
+            if hasattr(tokens, "close"):
+                tokens.close()
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    def _follow(self, flight):
+        seen = 0
+        try:
+            while True:
+                with flight.cond:
+                    while seen == len(flight.tokens) and not flight.done:
+                        flight.cond.wait()
+                    new_tokens = flight.tokens[seen:]
+                    finished = flight.done
+                for token in new_tokens:
+                    yield token
+                seen += len(new_tokens)
+                if finished and seen == len(flight.tokens):
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            with self._lock:
+                flight.readers -= 1
+
+
+@st.cache_resource
+def get_single_flight():
+    """Shared request coalescer for the whole Streamlit server process"""
+    return SingleFlight()
+
+def flight_key(llm, messages):
+    """Key identifying an LLM call by model, parameters, credentials and prompt"""
+    params = dict(getattr(llm, "_identifying_params", {}))
+    params["endpoint"] = getattr(llm, "openai_api_base", None) or getattr(llm, "base_url", None)
+    api_key = getattr(llm, "openai_api_key", None)
+    params["api_key"] = hash_secret(api_key.get_secret_value()) if api_key else None
+    prompt = [(m.type, m.content) for m in messages]
+    payload = repr((type(llm).__name__, sorted(params.items(), key=lambda item: item[0]), prompt))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def coalesced_stream(llm, messages):
+    """Stream the text tokens of ``llm`` for ``messages``, sharing identical in-flight calls"""
+    def producer():
+        for chunk in llm.stream(messages):
+            token = getattr(chunk, "content", chunk)
+            if token:
+                yield token
+    return get_single_flight().stream(flight_key(llm, messages), producer)
+
+def configure_openai_llm(generation_limits=False):
+    """Configure OpenAI LLM with persistent connection inside sidebar.
+
+    Args:
+        generation_limits (bool): apply GENERATION_LIMITS["openai"] stop sequences and max_tokens
+    """
     st.sidebar.markdown("---")
     st.sidebar.subheader("🔑 OpenAI Configuration")
 
@@ -129,14 +822,13 @@ def configure_openai_llm():
 
     # When button was clicked, attempt to connect
     if st.session_state.openai_connect_clicked and not st.session_state.openai_connected:
-        try:
-            client = openai.OpenAI(api_key=openai_api_key)
-            client.models.list()  # Test key
+        ok, error = check_openai_credentials(openai_api_key)  # Test key
+        if ok:
             st.session_state.openai_connected = True
             st.sidebar.success("✅ Successfully connected to OpenAI!")
             st.rerun()
-        except Exception as e:
-            st.sidebar.error(f"❌ Failed to connect: {e}")
+        else:
+            st.sidebar.error(f"❌ Failed to connect: {error}")
             st.session_state.openai_connected = False
             st.session_state.openai_connect_clicked = False
 
@@ -162,18 +854,29 @@ def configure_openai_llm():
     )
 
     from langchain_openai import ChatOpenAI
-    llm = ChatOpenAI(
-        model=model,
-        temperature=temperature,
-        streaming=True,
-        api_key=convert_to_secret_str(openai_api_key)
+    limits = GENERATION_LIMITS["openai"] if generation_limits else {}
+    llm = get_or_create_llm(
+        "openai", model, temperature,
+        lambda: ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            streaming=True,
+            api_key=convert_to_secret_str(openai_api_key),
+            **limits
+        ),
+        api_key=openai_api_key,
+        **limits
     )
 
     return llm
 
 
-def configure_ollama_llm():
-    """Configure Ollama LLM - Keep errors for demonstration"""
+def configure_ollama_llm(generation_limits=False):
+    """Configure Ollama LLM - Keep errors for demonstration
+
+    Args:
+        generation_limits (bool): apply GENERATION_LIMITS["ollama"] stop sequences and num_predict
+    """
     st.sidebar.markdown("---")
     st.sidebar.subheader("🦙 Ollama Configuration")
     
@@ -211,12 +914,19 @@ def configure_ollama_llm():
             return None
         
         # Only tinyllama should work
-        llm = ChatOllama(
-            model=model_name,
-            base_url=ollama_endpoint,
-            temperature=ollama_temperature,
-            num_gpu=0,
-            timeout=60,
+        limits = GENERATION_LIMITS["ollama"] if generation_limits else {}
+        llm = get_or_create_llm(
+            "ollama", model_name, ollama_temperature,
+            lambda: ChatOllama(
+                model=model_name,
+                base_url=ollama_endpoint,
+                temperature=ollama_temperature,
+                num_gpu=0,
+                timeout=60,
+                **limits
+            ),
+            endpoint=ollama_endpoint,
+            **limits
         )
         st.sidebar.success(f"✅ {model_name} connected!")
         return llm
@@ -227,8 +937,68 @@ def configure_ollama_llm():
         st.sidebar.info(f"💡 Only 'tinyllama (Recommended)' is installed. Run: `ollama pull {model_name}`")
         return None
 
-def configure_llm():
-    """Main LLM configuration with automatic cache management"""
+def configure_fake_llm(generation_limits=False):
+    """Configure the deterministic offline chat model used for load testing.
+
+    Defaults come from FAKE_LLM_TPS, FAKE_LLM_TTFT, FAKE_LLM_JITTER and
+    FAKE_LLM_FAILURE_RATE; FAKE_LLM_SCRIPT may point to a JSON file with
+    scripted ``responses`` and ``tool_calls``.
+    """
+    from fake_llm import FakeChatModel
+
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("🧪 Fake Model Configuration")
+
+    tokens_per_second = st.sidebar.slider(
+        "Tokens per second", min_value=1.0, max_value=500.0,
+        value=float(os.environ.get("FAKE_LLM_TPS", 50)), key="fake_llm_tps"
+    )
+    time_to_first_token = st.sidebar.slider(
+        "Time to first token (s)", min_value=0.0, max_value=5.0,
+        value=float(os.environ.get("FAKE_LLM_TTFT", 0.2)), key="fake_llm_ttft"
+    )
+    jitter = st.sidebar.slider(
+        "Latency jitter", min_value=0.0, max_value=1.0,
+        value=float(os.environ.get("FAKE_LLM_JITTER", 0.0)), key="fake_llm_jitter"
+    )
+    failure_rate = st.sidebar.slider(
+        "Failure rate", min_value=0.0, max_value=1.0,
+        value=float(os.environ.get("FAKE_LLM_FAILURE_RATE", 0.0)), key="fake_llm_failure_rate"
+    )
+
+    script = {}
+    script_path = os.environ.get("FAKE_LLM_SCRIPT")
+    if script_path:
+        try:
+            with open(script_path, encoding="utf-8") as f:
+                script = json.load(f)
+        except Exception as e:
+            st.sidebar.error(f"❌ Could not load fake model script: {e}")
+
+    limits = GENERATION_LIMITS["fake"] if generation_limits else {}
+    options = dict(
+        tokens_per_second=tokens_per_second,
+        time_to_first_token=time_to_first_token,
+        jitter=jitter,
+        failure_rate=failure_rate,
+        responses=script.get("responses", []),
+        tool_calls=script.get("tool_calls", []),
+    )
+    llm = get_or_create_llm(
+        "fake", "fake-chat", 0.0,
+        lambda: FakeChatModel(**options, **limits),
+        **options, **limits
+    )
+    st.sidebar.success("✅ Fake model ready (offline)")
+    return llm
+
+def configure_llm(generation_limits=False):
+    """Main LLM configuration with automatic cache management
+
+    Args:
+        generation_limits (bool): stop generation at hallucinated conversation
+            turns and cap output length (see GENERATION_LIMITS)
+    """
     
     # Clear cache on provider change
     clear_llm_cache_on_provider_change()
@@ -236,9 +1006,12 @@ def configure_llm():
     st.sidebar.header("🤖 Choose Your AI Model")
     
     # LLM type selection
+    provider_options = ["OpenAI (Cloud - Recommended)", "Ollama (Local)"]  # FIXED: Added the labels back
+    if env_flag("ENABLE_FAKE_LLM"):
+        provider_options.append(FAKE_LLM_PROVIDER)
     llm_type = st.sidebar.radio(
         label="Select AI Provider",
-        options=["OpenAI (Cloud - Recommended)", "Ollama (Local)"],  # FIXED: Added the labels back
+        options=provider_options,
         index=0,  
         help="Choose between cloud-based OpenAI or local Ollama",
         key="llm_provider_selection"
@@ -246,12 +1019,14 @@ def configure_llm():
     
     
     if llm_type == "OpenAI (Cloud - Recommended)":  # FIXED: Match the exact option
-        llm = configure_openai_llm()
+        llm = configure_openai_llm(generation_limits)
         if llm is None:
             st.sidebar.info("🔑 Enter your OpenAI API key above to start chatting")
             st.stop()
+    elif llm_type == FAKE_LLM_PROVIDER:
+        llm = configure_fake_llm(generation_limits)
     else:  # Ollama
-        llm = configure_ollama_llm()
+        llm = configure_ollama_llm(generation_limits)
         if llm is None:
             st.sidebar.info("🦙 Start Ollama service or switch to OpenAI")
             st.stop()
@@ -259,9 +1034,10 @@ def configure_llm():
     return llm
 
 def clear_chat_history():
-    """Clear chat history"""
+    """Clear chat history, including what this session's conversation memories remember"""
     if "messages" in st.session_state:
         st.session_state.messages = [{"role": "assistant", "content": "How can I help you?"}]
+    get_session_memory_store().evict_session(get_session_id())
     st.rerun()
 
 # Add clear button to sidebar in your main apps
@@ -303,10 +1079,14 @@ def configure_llm_internet():
     # LLM Provider Selection
     provider = st.sidebar.radio(
         "Select LLM Provider:",
-        ["OpenAI", "Ollama"],
+        ["OpenAI", "Ollama", "Fake"] if env_flag("ENABLE_FAKE_LLM") else ["OpenAI", "Ollama"],
         key="internet_llm_provider_selection"
     )
 
+    # ------------------ FAKE (offline testing) ------------------
+    if provider == "Fake":
+        return configure_fake_llm(), tavily_client
+
     # ------------------ OPENAI ------------------
     if provider == "OpenAI":
         api_key = st.sidebar.text_input(
@@ -322,20 +1102,28 @@ def configure_llm_internet():
 
         try:
             from langchain_openai import ChatOpenAI
-            llm = ChatOpenAI(
-                model="gpt-3.5-turbo",
-                api_key=convert_to_secret_str(api_key),
-                temperature=0.7,
-                streaming=True
+            llm = get_or_create_llm(
+                "openai", "gpt-3.5-turbo", 0.7,
+                lambda: ChatOpenAI(
+                    model="gpt-3.5-turbo",
+                    api_key=convert_to_secret_str(api_key),
+                    temperature=0.7,
+                    streaming=True
+                ),
+                api_key=api_key
             )
-            # Test the connection
-            llm.invoke("Hello")
-            st.sidebar.success("✅ OpenAI is ready!")
-            return llm, tavily_client
         except Exception as e:
             st.sidebar.error(f"❌ OpenAI initialization failed: {e}")
             return None, tavily_client
 
+        # Test the key (cached; no completion is spent on it)
+        ok, error = check_openai_credentials(api_key)
+        if not ok:
+            st.sidebar.error(f"❌ OpenAI initialization failed: {error}")
+            return None, tavily_client
+        st.sidebar.success("✅ OpenAI is ready!")
+        return llm, tavily_client
+
     # ------------------ OLLAMA ------------------
     else:
         # Allow user to select from available Ollama models
@@ -367,12 +1155,16 @@ def configure_llm_internet():
                 st.sidebar.info(f"💡 Use 'tinyllama (Recommended)' or run: `ollama pull {model_name}`")
                 return None, tavily_client
 
-            llm = ChatOllama(
-                model=model_name,
-                base_url=ollama_endpoint,
-                temperature=ollama_temperature,
-                num_gpu=0,
-                timeout=60,
+            llm = get_or_create_llm(
+                "ollama", model_name, ollama_temperature,
+                lambda: ChatOllama(
+                    model=model_name,
+                    base_url=ollama_endpoint,
+                    temperature=ollama_temperature,
+                    num_gpu=0,
+                    timeout=60,
+                ),
+                endpoint=ollama_endpoint
             )
             st.sidebar.success(f"✅ {model_name} connected!")
             return llm, tavily_client
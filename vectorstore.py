@@ -0,0 +1,488 @@
+import os
+import uuid
+import tempfile
+import threading
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from hybrid import BM25Index
+
+
+def embed_documents(embedding, texts):
+    """Embed ``texts`` as a float32 matrix, without a list round trip when the model supports it"""
+    if hasattr(embedding, "embed_documents_array"):
+        return embedding.embed_documents_array(texts)
+    return np.asarray(embedding.embed_documents(texts), dtype=np.float32)
+
+
+def normalize_rows(vectors):
+    """Return ``vectors`` as a float32 matrix with unit-length rows"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k(scores, k):
+    """Indices of the ``k`` highest scores, best first, via argpartition"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def mmr_select(query_vector, candidates, k, lambda_mult=0.5):
+    """Greedy maximal marginal relevance over unit-normalized ``candidates``.
+
+    Returns row positions into ``candidates`` in selection order.
+    """
+    n = len(candidates)
+    k = min(k, n)
+    if k <= 0:
+        return []
+    relevance = candidates @ query_vector
+    selected = [int(np.argmax(relevance))]
+    # Highest similarity of each candidate to anything already selected
+    redundancy = candidates @ candidates[selected[0]]
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+    while len(selected) < k:
+        score = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        score[~available] = -np.inf
+        best = int(np.argmax(score))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, candidates @ candidates[best])
+    return selected
+
+
+def spherical_kmeans(vectors, n_clusters, iterations=8, seed=0):
+    """k-means on unit vectors with cosine similarity; returns unit centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign_clusters(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        starts = np.searchsorted(labels[order], np.arange(n_clusters))
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.add.reduceat(vectors[order], np.minimum(starts, len(vectors) - 1), axis=0)
+        sums[counts == 0] = 0
+        empty = ~sums.any(axis=1)
+        # Re-seed empty clusters from random rows so every list gets used
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+def assign_clusters(vectors, centroids, block=65536):
+    """Index of the most similar centroid for every row, computed in blocks"""
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), block):
+        labels[start:start + block] = np.argmax(vectors[start:start + block] @ centroids.T, axis=1)
+    return labels
+
+
+class IVFIndex:
+    """Inverted-file (IVF) index over the rows of a NumpyVectorStore.
+
+    Rows are clustered around ``nlist`` k-means centroids; a query only
+    scores the rows of the ``nprobe`` closest clusters. More probes mean
+    higher recall and slower queries; probing every list is exact search.
+    """
+
+    def __init__(self, vectors, nlist=None, iterations=8, points_per_list=64, seed=0):
+        n = len(vectors)
+        self.nlist = min(n, nlist or int(np.clip(np.sqrt(n), 16, 4096)))
+        # k-means only needs a few dozen points per centroid
+        sample_size = points_per_list * self.nlist
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(n, sample_size, replace=False)] if n > sample_size else vectors
+        self.centroids = spherical_kmeans(sample, self.nlist, iterations, seed)
+        self.labels = assign_clusters(vectors, self.centroids)
+        self.trained_size = n
+        self._lists = None
+
+    def add(self, vectors):
+        self.labels = np.concatenate([self.labels, assign_clusters(vectors, self.centroids)])
+        self._lists = None
+
+    def move(self, src, dst):
+        """Row ``src`` was moved to ``dst`` and the last row dropped"""
+        self.labels[dst] = self.labels[src]
+        self.labels = self.labels[:-1]
+        self._lists = None
+
+    def candidates(self, query, nprobe):
+        """Row indices in the ``nprobe`` lists closest to ``query``"""
+        if self._lists is None:
+            order = np.argsort(self.labels, kind="stable")
+            bounds = np.searchsorted(self.labels[order], np.arange(self.nlist + 1))
+            self._lists = (order, bounds)
+        order, bounds = self._lists
+        probes = top_k(self.centroids @ query, nprobe)
+        return np.concatenate([order[bounds[c]:bounds[c + 1]] for c in probes])
+
+
+class Int8Quantizer:
+    """Scalar int8 codes for unit vectors (4x smaller than float32)"""
+
+    dtype = np.int8
+    rescore_factor = 4
+
+    def __init__(self):
+        self.scale = None
+
+    def width(self, dim):
+        return dim
+
+    def encode(self, vectors):
+        if self.scale is None:
+            # Fixed on the first batch; later outliers are clipped
+            self.scale = 127.0 / max(float(np.abs(vectors).max()), 1e-6)
+        return np.clip(np.rint(vectors * self.scale), -127, 127).astype(np.int8)
+
+    def scores(self, codes, query, block=8192):
+        # Small blocks keep the float32 copy of the codes in cache
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), block):
+            out[start:start + block] = codes[start:start + block].astype(np.float32) @ query
+        return out / self.scale
+
+
+class BinaryQuantizer:
+    """Sign-bit codes for unit vectors (32x smaller than float32).
+
+    Codes are scored asymmetrically, as -1/+1 vectors against the float
+    query: costlier than a Hamming distance but a far better shortlist.
+    """
+
+    dtype = np.uint8
+    rescore_factor = 32
+
+    def width(self, dim):
+        return (dim + 7) // 8
+
+    def encode(self, vectors):
+        return np.packbits(vectors > 0, axis=1)
+
+    def scores(self, codes, query, block=8192):
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), block):
+            bits = np.unpackbits(codes[start:start + block], axis=1, count=len(query))
+            out[start:start + block] = bits.astype(np.float32) @ query
+        # bits . q  ->  (2 * bits - 1) . q
+        return 2 * out - query.sum()
+
+
+QUANTIZERS = {"int8": Int8Quantizer, "binary": BinaryQuantizer}
+
+
+class NumpyVectorStore(VectorStore):
+    """In-memory vector store on one contiguous, normalized float32 matrix.
+
+    Rows are unit length, so cosine similarity for every chunk is a single
+    matrix-vector product; the top k are then picked with argpartition
+    instead of a full sort. MMR reuses the same matrix for its candidates.
+    The matrix grows geometrically, and deleting swaps the last row into
+    the hole so live rows always stay contiguous.
+
+    Passing ``nprobe`` to a search (e.g. through the retriever's
+    ``search_kwargs``) switches it to approximate search over an IVFIndex.
+    The first such search on a store of at least ``ivf_min_size`` rows
+    starts training the index in a background thread, and writes that
+    double the store since start a retrain; searches stay exact (or use
+    the previous index) until training finishes, so k-means never runs
+    under the store lock. Smaller stores are always searched exactly.
+
+    With ``keyword_index`` the store also maintains a BM25Index over the
+    same chunks for keyword_search / hybrid.HybridRetriever.
+
+    ``quantization`` ('int8' or 'binary') keeps compact codes in RAM and
+    scans those instead; only a shortlist of ``rescore_factor * k``
+    candidates is rescored on the full-precision matrix. With ``mmap_dir``
+    that matrix lives in an anonymous memory-mapped file there, so the OS
+    only keeps the pages being rescored resident.
+    """
+
+    def __init__(self, embedding: Embeddings, initial_capacity: int = 1024,
+                 nlist: Optional[int] = None, ivf_min_size: int = 4096, keyword_index: bool = True,
+                 quantization: Optional[str] = None, rescore_factor: Optional[int] = None,
+                 mmap_dir: Optional[str] = None):
+        self.embedding = embedding
+        self.quantizer = QUANTIZERS[quantization]() if quantization else None
+        self.rescore_factor = rescore_factor or (self.quantizer.rescore_factor if self.quantizer else 1)
+        self.mmap_dir = mmap_dir
+        self._codes = None
+        self.keywords = BM25Index() if keyword_index else None
+        self.nlist = nlist
+        self.ivf_min_size = ivf_min_size
+        self._ivf = None
+        self._ivf_wanted = False
+        self._ivf_thread = None
+        self._generation = 0  # bumped by deletes, which invalidate an index being trained
+        self._matrix = None
+        self._size = 0
+        self._initial_capacity = initial_capacity
+        self._docs: List[Document] = []
+        self._ids: List[str] = []
+        self._rows = {}
+        self._lock = threading.RLock()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def vectors(self):
+        """View of the live rows of the matrix"""
+        if self._matrix is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._matrix[:self._size]
+
+    # ---- writes ----
+    def _embed_documents(self, texts):
+        return embed_documents(self.embedding, texts)
+
+    def _allocate(self, capacity, dim):
+        if self.mmap_dir is None:
+            return np.empty((capacity, dim), dtype=np.float32)
+        os.makedirs(self.mmap_dir, exist_ok=True)
+        # Unlinked on creation: the mapping keeps the data alive, nothing is left behind
+        backing = tempfile.TemporaryFile(dir=self.mmap_dir)
+        backing.truncate(capacity * dim * 4)
+        return np.memmap(backing, dtype=np.float32, mode="r+", shape=(capacity, dim))
+
+    def _reserve(self, rows, dim):
+        if self._matrix is None:
+            capacity = max(self._initial_capacity, rows)
+            self._matrix = self._allocate(capacity, dim)
+            if self.quantizer is not None:
+                self._codes = np.empty((capacity, self.quantizer.width(dim)), dtype=self.quantizer.dtype)
+        elif self._size + rows > len(self._matrix):
+            capacity = max(len(self._matrix) * 2, self._size + rows)
+            grown = self._allocate(capacity, dim)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+            if self._codes is not None:
+                codes = np.empty((capacity, self._codes.shape[1]), dtype=self._codes.dtype)
+                codes[:self._size] = self._codes[:self._size]
+                self._codes = codes
+
+    def add_embeddings(self, texts, embeddings, metadatas=None, ids=None) -> List[str]:
+        """Add precomputed embeddings; returns the ids of the new rows"""
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            self.delete([i for i in ids if i in self._rows])
+            self._reserve(len(texts), embeddings.shape[1])
+            start = self._size
+            # Normalize in place inside the matrix to avoid another copy
+            block = self._matrix[start:start + len(texts)]
+            block[:] = embeddings
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            block /= norms
+            if self._codes is not None:
+                self._codes[start:start + len(texts)] = self.quantizer.encode(block)
+            if self._ivf is not None:
+                self._ivf.add(block)
+            if self.keywords is not None:
+                self.keywords.add(ids, texts)
+            for offset, (text, metadata, doc_id) in enumerate(zip(texts, metadatas, ids)):
+                self._docs.append(Document(page_content=text, metadata=metadata, id=doc_id))
+                self._ids.append(doc_id)
+                self._rows[doc_id] = start + offset
+            self._size += len(texts)
+            if self._ivf_wanted:
+                self._start_ivf_training()
+        return ids
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        return self.add_embeddings(texts, self._embed_documents(texts), metadatas, ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if ids is None:
+            with self._lock:
+                self._size = 0
+                self._docs, self._ids, self._rows = [], [], {}
+                self._ivf = None
+                self._generation += 1
+                if self.keywords is not None:
+                    self.keywords.clear()
+            return True
+        with self._lock:
+            if self.keywords is not None:
+                self.keywords.delete(ids)
+            for doc_id in ids:
+                row = self._rows.pop(doc_id, None)
+                if row is None:
+                    continue
+                last = self._size - 1
+                if row != last:
+                    # Swap the last row into the hole to keep rows contiguous
+                    self._matrix[row] = self._matrix[last]
+                    if self._codes is not None:
+                        self._codes[row] = self._codes[last]
+                    self._docs[row] = self._docs[last]
+                    self._ids[row] = self._ids[last]
+                    self._rows[self._ids[row]] = row
+                if self._ivf is not None:
+                    self._ivf.move(last, row)
+                self._generation += 1
+                self._docs.pop()
+                self._ids.pop()
+                self._size -= 1
+        return True
+
+    def get_by_ids(self, ids) -> List[Document]:
+        with self._lock:
+            return [self._docs[self._rows[i]] for i in ids if i in self._rows]
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, **kwargs: Any) -> "NumpyVectorStore":
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids)
+        return store
+
+    # ---- search ----
+    def _query_vector(self, query):
+        return normalize_rows(self.embedding.embed_query(query))[0]
+
+    def _select_relevance_score_fn(self):
+        # Scores are already cosine similarities
+        return lambda score: score
+
+    # ---- IVF ----
+    def train_ivf(self, wait=False):
+        """Start training the IVF index if it is due; returns the current index (None if untrained).
+
+        From then on writes that double the store retrain it too. ``wait``
+        blocks until training (and any retrain it triggers) has finished.
+        """
+        with self._lock:
+            self._ivf_wanted = True
+            self._start_ivf_training()
+            thread = self._ivf_thread
+        while wait and thread is not None:
+            thread.join()
+            with self._lock:
+                thread = self._ivf_thread
+        return self._ivf
+
+    def _start_ivf_training(self):
+        """Train in the background when no index exists or the store doubled since; caller holds the lock"""
+        if self._ivf_thread is not None or self._size < self.ivf_min_size:
+            return
+        if self._ivf is not None and self._size < 2 * self._ivf.trained_size:
+            return
+        # Appends never move existing rows, so the live rows can be read without the lock
+        self._ivf_thread = threading.Thread(
+            target=self._train_ivf, args=(self.vectors, self._generation), daemon=True
+        )
+        self._ivf_thread.start()
+
+    def _train_ivf(self, vectors, generation):
+        index = None
+        try:
+            index = IVFIndex(vectors, self.nlist)
+        finally:
+            with self._lock:
+                self._ivf_thread = None
+                if index is not None and generation == self._generation:
+                    # Assign the rows added while training, then swap the index in
+                    index.add(self._matrix[len(vectors):self._size])
+                    self._ivf = index
+                elif index is not None:
+                    # Rows were deleted meanwhile: train again on what is left
+                    self._start_ivf_training()
+
+    def _scored_rows(self, query, k, nprobe=None):
+        """Top ``k`` (rows, scores) over all rows or the IVF candidates.
+
+        Quantized stores shortlist on their codes and rescore the shortlist
+        on the full-precision matrix.
+        """
+        rows = None
+        if nprobe is not None and self._size >= self.ivf_min_size:
+            ivf = self.train_ivf()
+            if ivf is not None:
+                rows = ivf.candidates(query, nprobe)
+
+        if self._codes is not None:
+            codes = self._codes[:self._size] if rows is None else self._codes[rows]
+            shortlist = top_k(self.quantizer.scores(codes, query), k * self.rescore_factor)
+            # Sorted rows read the memory-mapped matrix front to back
+            rows = np.sort(shortlist if rows is None else rows[shortlist])
+
+        if rows is None:
+            scores = self.vectors @ query
+            best = top_k(scores, k)
+            return best, scores[best]
+        scores = self._matrix[rows] @ query
+        best = top_k(scores, k)
+        return rows[best], scores[best]
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4,
+                                               nprobe: Optional[int] = None) -> List[Tuple[Document, float]]:
+        query = normalize_rows(embedding)[0]
+        with self._lock:
+            if not self._size:
+                return []
+            rows, scores = self._scored_rows(query, k, nprobe)
+            return [(self._docs[i], float(score)) for i, score in zip(rows, scores)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, nprobe: Optional[int] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._query_vector(query), k, nprobe)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, nprobe: Optional[int] = None,
+                                    **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, nprobe)]
+
+    def similarity_search(self, query: str, k: int = 4, nprobe: Optional[int] = None,
+                          **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, nprobe)]
+
+    def keyword_search(self, query: str, k: int = 4) -> List[Document]:
+        """BM25 keyword search over the same chunks"""
+        if self.keywords is None:
+            return []
+        with self._lock:
+            return [self._docs[self._rows[doc_id]] for doc_id, _ in self.keywords.search(query, k)]
+
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                lambda_mult: float = 0.5, nprobe: Optional[int] = None,
+                                                **kwargs: Any) -> List[Document]:
+        query = normalize_rows(embedding)[0]
+        with self._lock:
+            if not self._size:
+                return []
+            candidates, _ = self._scored_rows(query, fetch_k, nprobe)
+            picked = mmr_select(query, self._matrix[candidates], k, lambda_mult)
+            return [self._docs[candidates[i]] for i in picked]
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20,
+                                      lambda_mult: float = 0.5, nprobe: Optional[int] = None,
+                                      **kwargs: Any) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(self._query_vector(query), k, fetch_k,
+                                                            lambda_mult, nprobe)
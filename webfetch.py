@@ -0,0 +1,122 @@
+"""Concurrent HTTP fetching for the Websites page, importable without streamlit."""
+import time
+import threading
+from collections import defaultdict, deque
+from urllib.parse import urlsplit
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+class DeadlineExceeded(TimeoutError):
+    """A batch's deadline passed before the request got (or finished) its turn"""
+
+
+def host_of(url):
+    return urlsplit(url).netloc
+
+
+class Fetcher:
+    """Bounded thread pool of GETs over one keep-alive ``requests.Session``.
+
+    At most ``max_workers`` requests run at once and at most ``per_host``
+    of them against the same host, so a batch of URLs behind one server (or
+    one reader proxy) does not hammer it. The host limit is applied when
+    work is scheduled: work for a busy host waits in a per-host queue
+    instead of holding a pool thread, so it never starves other hosts (or
+    other sessions) of workers. Safe to share between sessions.
+    """
+
+    def __init__(self, max_workers=8, per_host=4, timeout=25.0, headers=None):
+        self.timeout = timeout
+        self.per_host = per_host
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self._queues = defaultdict(deque)
+        self._active = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def get(self, url, deadline=None, **kwargs):
+        """GET ``url``; raises for HTTP errors and when ``deadline`` passes first.
+
+        Not host-limited by itself: run it through ``submit``/``map`` with
+        a host to share the host's slots.
+        """
+        timeout = self.timeout
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                raise DeadlineExceeded(f"deadline passed before fetching {url}")
+        response = self.session.get(url, timeout=timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def submit(self, fn, *args, host=None):
+        """Run ``fn(*args)`` on the fetch pool; with ``host``, once one of that host's slots is free"""
+        if host is None:
+            return self._executor.submit(fn, *args)
+        future = Future()
+        with self._lock:
+            self._queues[host].append((future, fn, args))
+        self._dispatch(host)
+        return future
+
+    def _dispatch(self, host):
+        with self._lock:
+            queue = self._queues[host]
+            while queue and self._active[host] < self.per_host:
+                future, fn, args = queue.popleft()
+                if future.set_running_or_notify_cancel():
+                    self._active[host] += 1
+                    self._executor.submit(self._run, host, future, fn, args)
+            if not queue:
+                del self._queues[host]
+
+    def _run(self, host, future, fn, args):
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                self._active[host] -= 1
+                if not self._active[host]:
+                    del self._active[host]
+            self._dispatch(host)
+
+    def map(self, fn, items, deadline=None, host=None):
+        """Yield ``(item, fn(item), error)`` for every item, in completion order.
+
+        ``host(item)``, if given, names the host an item's work goes to (see
+        ``submit``). ``deadline`` is a ``time.monotonic()`` value: items
+        still queued or in flight when it passes are yielded with a
+        DeadlineExceeded error, so callers can go on with whatever arrived
+        in time.
+        """
+        futures = {self.submit(fn, item, host=host(item) if host else None): item for item in items}
+        pending = set(futures)
+        while pending:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                yield futures[future], None if error else future.result(), error
+            if not done:
+                # Deadline: give up on the rest (their threads finish on their own)
+                for future in pending:
+                    future.cancel()
+                    yield futures[future], None, DeadlineExceeded(f"no response from {futures[future]} before the deadline")
+                return
+
+    def fetch_all(self, urls, deadline=None, **kwargs):
+        """Yield ``(url, response, error)`` for every url, in completion order; see ``map``"""
+        return self.map(lambda url: self.get(url, deadline, **kwargs), urls, deadline, host=host_of)